@@ -5,35 +5,588 @@ local usage:
 get:
 curl http://localhost:5000/subcalendars
 
+compact shape, per subcalendar parallel arrays of date ordinals, names, completion flags and study minutes
+(also accepted by /assignments). responses are gzip or brotli compressed when the client accepts it:
+curl --compressed "http://localhost:5000/subcalendars?shape=columnar"
+
+streamed one subcalendar at a time as a json array, or as newline delimited json:
+curl "http://localhost:5000/subcalendars?stream=1"
+curl -H "Accept: application/x-ndjson" http://localhost:5000/subcalendars
+
+get assignments in a date range, optionally filtered by subcalendar and completion:
+curl "http://localhost:5000/assignments?from=20250601&to=20250630&subcal=cop4504,mac2311&completed=false"
+
+aggregate stats (optionally grouped by day, week or month):
+curl "http://localhost:5000/stats?from=20250101&to=20251231&by=month&subcal=cop4504"
+
 post:
 curl -X POST http://localhost:5000/subcalendars \
      -H "Content-Type: application/json" \
      -d '{"name": "<date>", "assignments": []}'
 
+assignment changes, applied to the stored subcalendar instead of re-posting all of it.
+assignments are matched by due date and name:
+curl -X POST http://localhost:5000/subcalendars/<name>/assignments \
+     -d '{"name": "Quiz", "year": 2025, "month": 7, "day": 2, "studytime": 30}'
+curl -X PATCH http://localhost:5000/subcalendars/<name>/assignments \
+     -d '{"match": {"name": "Quiz", "year": 2025, "month": 7, "day": 2}, "completed": true, "to": {"year": 2025, "month": 7, "day": 3}}'
+curl -X DELETE http://localhost:5000/subcalendars/<name>/assignments \
+     -d '{"match": {"name": "Quiz", "year": 2025, "month": 7, "day": 3}}'
+batch (ops: create, update, move, delete):
+curl -X POST http://localhost:5000/subcalendars/<name>/changes \
+     -d '[{"op": "create", "assignment": {...}}, {"op": "delete", "match": {...}}]'
+
 azure app service deployment environment variables:
 CALICULA_STORAGE_BACKEND -> azure
 AZURE_CONNECTION_STRING
 AZURE_CONTAINER
+
+metrics in prometheus text format (per worker process). every response also carries a
+Server-Timing header with the time spent in storage calls and serialization:
+curl http://localhost:5000/metrics
+
+optional:
+CALICULA_CACHE_TTL -> seconds to serve subcalendars from memory before re-reading storage (default 30)
+CALICULA_SHARED_CACHE -> sqlite file shared by worker processes so they don't each re-read storage
+
+production, several worker processes (see wsgi.py):
+gunicorn -c gunicorn.conf.py wsgi:app
+python serve.py --workers 4
 """
 
-from flask import Flask, jsonify, request, send_from_directory
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime
+from flask import Flask, Response, g, has_request_context, jsonify, request, send_from_directory, stream_with_context
+import columnar
+import compression
+import metrics
+from shared_cache import SharedCache
 from storage import get_backend
-from subcalendar import Subcalendar
+from subcalendar import Assignment, Subcalendar
+from utils import contains_bad_chars
 
 app = Flask(__name__, static_folder="static")
-storage = get_backend()
+
+# created on first use rather than at import, so each server worker process opens (and then keeps
+# reusing) its own storage client instead of inheriting one across a fork. see wsgi.py
+storage = None
+storage_lock = threading.Lock()
+
+def init_storage():
+    global storage
+    with storage_lock:
+        if storage is None:
+            storage = get_backend()
+    return storage
+
+# seconds a loaded copy of storage is served before it is read again
+CACHE_TTL = float(os.getenv("CALICULA_CACHE_TTL", "30"))
+# sqlite file through which worker processes share the loaded payload, unset for a single process
+SHARED_CACHE_PATH = os.getenv("CALICULA_SHARED_CACHE")
+
+# ---- METRICS ----
+# per route latency and response size, plus time spent in storage calls and serialization, served by
+# /metrics and summed per request into a Server-Timing header
+registry = metrics.Registry()
+request_seconds = registry.histogram("calicula_http_request_duration_seconds", "Time to handle a request.",
+                                     metrics.LATENCY_BUCKETS, ("method", "route"))
+response_bytes = registry.histogram("calicula_http_response_size_bytes", "Response body size.",
+                                    metrics.SIZE_BUCKETS, ("method", "route"))
+requests_total = registry.counter("calicula_http_requests_total", "Requests handled.", ("method", "route", "status"))
+phase_seconds = registry.histogram("calicula_phase_duration_seconds", "Time spent in storage calls and serialization.",
+                                   metrics.LATENCY_BUCKETS, ("phase",))
+
+# time a block as a phase, e.g. "storage.read_all" or "serialize". safe to use outside requests
+@contextmanager
+def phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        phase_seconds.observe((name,), elapsed)
+        if has_request_context() and "phases" in g:
+            g.phases[name] = g.phases.get(name, 0.0) + elapsed
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.phases = {}
+    init_storage()
+
+@app.after_request
+def record_request(response):
+    if "request_start" not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_start
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    labels = (request.method, route)
+    request_seconds.observe(labels, elapsed)
+    requests_total.inc((request.method, route, str(response.status_code)))
+    if not response.is_streamed:
+        response_bytes.observe(labels, response.calculate_content_length() or 0)
+
+    # Server-Timing metric names are tokens, so the dots in phase names become underscores
+    entries = [f"{name.replace('.', '_')};dur={seconds * 1000:.2f}" for name, seconds in g.phases.items()]
+    entries.append(f"total;dur={elapsed * 1000:.2f}")
+    response.headers["Server-Timing"] = ", ".join(entries)
+    return response
+
+# registered after record_request so it runs first, and the recorded sizes are the compressed ones
+@app.after_request
+def compress_response(response):
+    if (response.status_code != 200 or response.direct_passthrough or "Content-Encoding" in response.headers
+            or not compression.compressible(response.mimetype)):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = compression.negotiate(request.accept_encodings)
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = compression.compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < compression.MIN_SIZE:
+            return response
+        with phase("compress"):
+            response.set_data(compression.compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+class SubcalendarCache:
+    """subcalendars read from storage with their serialized payload and etag, reused until the ttl runs out or a write.
+
+    With a SharedCache, a load is published for the other worker processes, which parse it instead of
+    reading storage, and a write in any process drops every process's copy.
+    """
+
+    def __init__(self, ttl: float, shared: SharedCache = None):
+        self.ttl = ttl
+        self.shared = shared
+        self.lock = threading.Lock()
+        self.generation = None
+        self._clear()
+
+    def _clear(self):
+        self.subcalendars = None
+        self.payload = None
+        self.etag = None
+        self.variants = {}
+        self.expires = 0.0
+
+    def invalidate(self):
+        with self.lock:
+            self._clear()
+            if self.shared is not None:
+                self.shared.invalidate()
+
+    # after one subcalendar was written, swap the written copy into the loaded list instead of reading
+    # storage again. other workers still drop theirs. if another worker wrote since this copy was
+    # loaded it is dropped too, so the next get reloads
+    def replace(self, subcalendar: Subcalendar):
+        with self.lock:
+            generation = self.shared.invalidate() if self.shared is not None else None
+            if self.subcalendars is None or (self.shared is not None and generation != self.generation + 1):
+                self._clear()
+                return
+            subcalendars = [subcalendar if sc.name == subcalendar.name else sc for sc in self.subcalendars]
+            with phase("serialize"):
+                payload = json.dumps([sc.to_dict() for sc in subcalendars], separators=(",", ":")).encode("utf-8")
+            ttl = self.expires - time.monotonic()  # a write doesn't extend how long the rest is trusted
+            self._set(subcalendars, payload, hashlib.sha256(payload).hexdigest(), ttl)
+            self.generation = generation
+            if self.shared is not None:
+                self.shared.store(generation, self.etag, payload, time.time() + ttl)
+
+    def _set(self, subcalendars, payload, etag, ttl):
+        self.subcalendars = subcalendars
+        self.payload = payload
+        self.etag = etag
+        self.variants = {}
+        self.expires = time.monotonic() + ttl
+
+    def get(self):
+        with self.lock:
+            generation = self.shared.generation() if self.shared is not None else None
+            if self.subcalendars is not None and time.monotonic() < self.expires and generation == self.generation:
+                return self.subcalendars, self.payload, self.etag
+
+            if self.shared is not None:
+                row = self.shared.load()
+                if row is not None and row[0] == generation:
+                    _, etag, payload, expires = row
+                    with phase("shared_cache.load"):
+                        subcalendars = [Subcalendar.from_dict(data) for data in json.loads(payload)]
+                    for sc in subcalendars:
+                        sc.mark_clean()
+                    self._set(subcalendars, payload, etag, expires - time.time())
+                    self.generation = generation
+                    return self.subcalendars, self.payload, self.etag
+
+            with phase("storage.read_all"):
+                subcalendars = init_storage().read_all()
+            with phase("serialize"):
+                payload = json.dumps([sc.to_dict() for sc in subcalendars], separators=(",", ":")).encode("utf-8")
+            self._set(subcalendars, payload, hashlib.sha256(payload).hexdigest(), self.ttl)
+            self.generation = generation
+            if self.shared is not None:
+                self.shared.store(generation, self.etag, payload, time.time() + self.ttl)
+            return self.subcalendars, self.payload, self.etag
+
+    # the payload in another shape and/or content coding with its own etag, built once per load
+    def representation(self, shape: str, encoding: str = None):
+        subcalendars, payload, etag = self.get()
+        if shape == "full" and encoding is None:
+            return payload, etag
+        key = (shape, encoding)
+        with self.lock:
+            if self.etag == etag and key in self.variants:
+                return self.variants[key]
+        if shape == "columnar":
+            with phase("serialize"):
+                payload = json.dumps([sc.to_columns() for sc in subcalendars], separators=(",", ":")).encode("utf-8")
+        if encoding is not None:
+            with phase("compress"):
+                payload = compression.compress(payload, encoding)
+        variant = (payload, f"{etag}-{shape}-{encoding or 'identity'}")
+        with self.lock:
+            if self.etag == etag:  # not reloaded meanwhile
+                self.variants[key] = variant
+        return variant
+
+    # the loaded subcalendars if they are still fresh, without loading anything
+    def peek(self):
+        with self.lock:
+            if self.subcalendars is None or time.monotonic() >= self.expires:
+                return None
+            if self.shared is not None and self.shared.generation() != self.generation:
+                return None  # another worker wrote since
+            return self.subcalendars
+
+cache = SubcalendarCache(CACHE_TTL, SharedCache(SHARED_CACHE_PATH) if SHARED_CACHE_PATH else None)
+# held by requests that write, from reading the cached copy until the written one replaces it
+write_lock = threading.Lock()
+
+# write_lock, and with a shared cache the lock every worker process writes under. a get() inside it
+# sees any generation bumped by another worker's write and reloads, so batches build on the latest data
+@contextmanager
+def writing():
+    with write_lock, (cache.shared.write_lock() if cache.shared is not None else nullcontext()):
+        yield
+
+# column arrays over the cached subcalendars for /stats, rebuilt per subcalendar as they change
+snapshot = columnar.ColumnarSnapshot() if columnar.available() else None
+snapshot_lock = threading.Lock()
+
+NDJSON = "application/x-ndjson"
+
+# yields subcalendars from storage.iter_all, recording the time spent waiting on storage as one phase
+def iter_storage():
+    elapsed = 0.0
+    iterator = storage.iter_all()
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                sc = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed += time.perf_counter() - start
+            yield sc
+    finally:
+        phase_seconds.observe(("storage.iter_all",), elapsed)
+
+# ?shape=columnar asks for Subcalendar.to_columns instead of to_dict, several times smaller for long archives
+def requested_shape():
+    shape = request.args.get("shape", "full")
+    if shape not in ("full", "columnar"):
+        raise ValueError("shape must be full or columnar")
+    return shape
+
+# the body of a streamed response, one subcalendar at a time: a json array, or one object per line
+def encode_stream(subcalendars, ndjson: bool, route_labels: tuple, shape: str = "full"):
+    sent = 0
+    try:
+        if not ndjson:
+            chunk = b"["
+            sent += len(chunk)
+            yield chunk
+        for i, sc in enumerate(subcalendars):
+            data = sc.to_columns() if shape == "columnar" else sc.to_dict()
+            chunk = json.dumps(data, separators=(",", ":")).encode("utf-8")
+            if ndjson:
+                chunk += b"\n"
+            elif i:
+                chunk = b"," + chunk
+            sent += len(chunk)
+            yield chunk
+        if not ndjson:
+            sent += 1
+            yield b"]"
+    finally:
+        response_bytes.observe(route_labels, sent)
 
 @app.route("/subcalendars", methods=["GET"])
 def get():
-    subcals = storage.read_all()
-    return jsonify([sc.to_dict() for sc in subcals])
+    # streamed on request (?stream=1, or NDJSON via ?format=ndjson or Accept) so a large archive starts
+    # arriving before it is fully read and is never held whole in memory. a fresh cached copy is streamed
+    # as is, otherwise subcalendars come straight from storage without filling the cache
+    try:
+        shape = requested_shape()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    ndjson = request.args.get("format") == "ndjson" or request.accept_mimetypes.best_match(["application/json", NDJSON]) == NDJSON
+    if ndjson or request.args.get("stream") in ("1", "true"):
+        fresh = cache.peek()
+        subcalendars = fresh if fresh is not None else iter_storage()
+        body = encode_stream(subcalendars, ndjson, (request.method, request.url_rule.rule), shape)
+        response = Response(stream_with_context(body), mimetype=NDJSON if ndjson else "application/json")
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    # compressed bodies are kept with the cached payload, so a hit doesn't compress again
+    encoding = compression.negotiate(request.accept_encodings)
+    payload, etag = cache.representation(shape, encoding)
+    # strong etag over the exact bytes served, so a matching If-None-Match can skip the body
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(payload, mimetype="application/json")
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    return response
 
 @app.route("/subcalendars", methods=["POST"])
 def post():
     sc = Subcalendar.from_dict(request.json)
-    storage.write(sc)
+    with writing():
+        with phase("storage.write"):
+            storage.write(sc)
+        cache.invalidate()
     return jsonify({"status": "ok"}), 201
 
+def parse_date_arg(name: str, default: date) -> date:
+    value = request.args.get(name)
+    if not value:
+        return default
+    return datetime.strptime(value, "%Y%m%d").date()
+
+# assignments in a date range, grouped by subcalendar in the same shape as GET /subcalendars.
+# subcalendars with nothing in range are still listed so clients can show every subcalendar name
+@app.route("/assignments", methods=["GET"])
+def get_assignments():
+    try:
+        start = parse_date_arg("from", date.min)
+        end = parse_date_arg("to", date.max)
+    except ValueError:
+        return jsonify({"error": "from and to must be dates in YYYYMMDD format"}), 400
+
+    names = request.args.get("subcal")
+    names = set(names.split(",")) if names else None
+
+    try:
+        shape = requested_shape()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    completed = request.args.get("completed")
+    if completed is not None:
+        if completed.lower() not in ("true", "false"):
+            return jsonify({"error": "completed must be true or false"}), 400
+        completed = completed.lower() == "true"
+
+    if storage.indexed_queries:
+        # let the backend's indexes do the filtering instead of loading every subcalendar
+        with phase("storage.query_assignments"):
+            subcalendars = [sc for sc in storage.list_subcalendars() if names is None or sc.name in names]
+            found = storage.query_assignments(start, end, [sc.name for sc in subcalendars], completed)
+    else:
+        subcalendars, _, _ = cache.get()
+        found = None
+
+    result = []
+    for sc in subcalendars:
+        if names is not None and sc.name not in names:
+            continue
+        if found is not None:
+            assignments = found.get(sc.name, [])
+        else:
+            assignments = sc.assignments_between(start, end)
+            if completed is not None:
+                assignments = [a for a in assignments if bool(a.completed) == completed]
+        if shape == "columnar":
+            result.append(sc.to_columns(assignments))
+            continue
+        result.append({
+            "name": sc.name,
+            "color": sc.color,
+            "hidden": sc.hidden,
+            "assignments": [a.to_dict() for a in assignments],
+        })
+    with phase("serialize"):
+        return jsonify(result)
+
+# aggregate counts, completions and study time over a date range, in total and per day/week/month
+@app.route("/stats", methods=["GET"])
+def get_stats():
+    if snapshot is None:
+        return jsonify({"error": "stats need numpy installed on the server"}), 501
+    try:
+        start = parse_date_arg("from", date.min)
+        end = parse_date_arg("to", date.max)
+    except ValueError:
+        return jsonify({"error": "from and to must be dates in YYYYMMDD format"}), 400
+    if start > end:
+        return jsonify({"error": "from must not be after to"}), 400
+    by = request.args.get("by")
+    if by not in (None, "day", "week", "month"):
+        return jsonify({"error": "by must be day, week or month"}), 400
+    if by is not None and (start == date.min or end == date.max):
+        return jsonify({"error": "from and to are required when grouping"}), 400
+    if by == "day" and end.toordinal() - start.toordinal() > 366 * 10:
+        return jsonify({"error": "daily stats are limited to ten years, narrow from and to"}), 400
+    names = request.args.get("subcal")
+    names = names.split(",") if names else None
+
+    subcalendars, _, _ = cache.get()
+    with snapshot_lock:
+        snapshot.refresh(subcalendars)
+        result = {"totals": snapshot.totals(start, end, names, include_hidden=True)}
+        if by is not None:
+            result[by] = snapshot.grouped(start, end, by, names, include_hidden=True)
+    return jsonify(result)
+
+class ChangeError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+def date_string(data: dict) -> str:
+    try:
+        return f"{int(data['year']):04d}{int(data['month']):02d}{int(data['day']):02d}"
+    except (KeyError, TypeError, ValueError):
+        raise ChangeError("year, month and day are required")
+
+def check_name(name):
+    if not isinstance(name, str) or not name.strip() or contains_bad_chars(name):
+        raise ChangeError(f"invalid assignment name: {name!r}")
+
+# assignments are identified by their due date and name
+def find_assignment(sc: Subcalendar, match: dict) -> Assignment:
+    if not isinstance(match, dict):
+        raise ChangeError("match must be an object with year, month, day and name")
+    try:
+        due = datetime.strptime(date_string(match), "%Y%m%d").date()
+    except ValueError:
+        raise ChangeError("match has an invalid date")
+    for a in sc.assignments_on(due):
+        if a.name == match.get("name"):
+            return a
+    raise ChangeError(f"no assignment {match.get('name')!r} on {due} in {sc.name}", 404)
+
+def apply_change(sc: Subcalendar, change: dict):
+    op = change.get("op")
+    try:
+        if op == "create":
+            data = change.get("assignment") or {}
+            check_name(data.get("name"))
+            a = Assignment(data["name"], date_string(data), bool(data.get("completed", False)), int(data.get("studytime", 0)))
+            sc.insert_assignment(a)
+        elif op in ("update", "move"):
+            a = find_assignment(sc, change.get("match"))
+            if "completed" in change and bool(change["completed"]) != bool(a.completed):
+                sc.toggle_completion(a)
+            if "name" in change:
+                check_name(change["name"])
+                sc.rename_assignment(a, change["name"])
+            if "studytime" in change:
+                sc.set_studytime(a, int(change["studytime"]))
+            if "to" in change:
+                sc.move_assignment(a, date_string(change["to"] or {}))
+        elif op == "delete":
+            sc.remove_assignment(find_assignment(sc, change.get("match")))
+        else:
+            raise ChangeError(f"unknown op: {op!r}")
+    except (AttributeError, TypeError, ValueError) as e:
+        raise ChangeError(f"invalid {op} change: {e}")
+
+# applies the changes to a copy of the stored subcalendar and hands them to the backend in one write.
+# changes are all-or-nothing: if one fails nothing is written. the cached subcalendars are shared by
+# every request, so they are never edited; the written copy takes its place. writes are serialized so
+# concurrent batches can't interleave
+def apply_changes(name: str, changes, status: int = 200):
+    if not isinstance(changes, list) or not all(isinstance(c, dict) for c in changes):
+        return jsonify({"error": "expected a list of changes"}), 400
+
+    with writing():
+        subcalendars, _, _ = cache.get()
+        sc = next((sc for sc in subcalendars if sc.name == name), None)
+        if sc is None:
+            return jsonify({"error": f"no subcalendar named {name!r}"}), 404
+
+        sc = sc.copy()
+        try:
+            for change in changes:
+                apply_change(sc, change)
+        except ChangeError as e:
+            return jsonify({"error": str(e)}), e.status
+
+        with phase("storage.write_changes"):
+            storage.write_changes(sc, changes)
+        sc.mark_clean()
+        cache.replace(sc)
+    return jsonify({"status": "ok", "applied": len(changes)}), status
+
+# the request body of the single assignment routes, which must be an object. None otherwise
+def object_body():
+    body = request.json or {}
+    return body if isinstance(body, dict) else None
+
+@app.route("/subcalendars/<name>/assignments", methods=["POST"])
+def create_assignment(name):
+    body = object_body()
+    if body is None:
+        return jsonify({"error": "expected an assignment object"}), 400
+    return apply_changes(name, [{"op": "create", "assignment": body}], 201)
+
+@app.route("/subcalendars/<name>/assignments", methods=["PATCH"])
+def update_assignment(name):
+    body = object_body()
+    if body is None:
+        return jsonify({"error": "expected an object with match and the fields to change"}), 400
+    return apply_changes(name, [dict(body, op="update")])
+
+@app.route("/subcalendars/<name>/assignments", methods=["DELETE"])
+def delete_assignment(name):
+    body = object_body()
+    if body is None:
+        return jsonify({"error": "expected an object with match"}), 400
+    return apply_changes(name, [{"op": "delete", "match": body.get("match")}])
+
+@app.route("/subcalendars/<name>/changes", methods=["POST"])
+def batch_changes(name):
+    return apply_changes(name, request.json)
+
+def warm_up():
+    """Open storage and load the cache before the first request, e.g. from a server's worker init hook."""
+    init_storage()
+    cache.get()
+
 @app.route("/")
 def index():
     return send_from_directory("static", "index.html")
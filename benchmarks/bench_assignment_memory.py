@@ -0,0 +1,76 @@
+# bench_assignment_memory.py - memory and construction time for large numbers of assignments
+#
+# compares the slotted Assignment against a copy of the previous dict-based one:
+#   python -m benchmarks.bench_assignment_memory --count 1000000
+
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import date, datetime
+
+from subcalendar import Assignment, Subcalendar
+
+# the pre-slots Assignment: a __dict__ per instance, strptime on every construction
+class LegacyAssignment:
+    def __init__(self, name: str, date: str, completed: bool, studytime: int = 0):
+        self.name = name
+        self.completed = completed
+        self.date = datetime.strptime(date, "%Y%m%d").date()
+        self.month = self.date.month
+        self.day = self.date.day
+        self.year = self.date.year
+        self.studytime = studytime
+
+def make_rows(count: int) -> list:
+    first = date(2015, 1, 1).toordinal()
+    rows = []
+    for i in range(count):
+        d = date.fromordinal(first + i % 3650)
+        rows.append((f"assignment {i % 1000}", f"{d.year:04d}{d.month:02d}{d.day:02d}", i % 2, i % 120))
+    return rows
+
+# timed and traced in separate runs, tracemalloc slows allocation down too much to time under it
+def measure(label: str, build, rows: list):
+    gc.collect()
+    start = time.perf_counter()
+    built = build(rows)
+    elapsed = time.perf_counter() - start
+    del built
+
+    gc.collect()
+    tracemalloc.start()
+    built = build(rows)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del built
+    print(f"{label:<28}{elapsed:>9.2f}s{current / 2**20:>10.1f} MiB{current / len(rows):>8.0f} B/assignment")
+
+def build_legacy(rows):
+    return [LegacyAssignment(*row) for row in rows]
+
+def build_slotted(rows):
+    return [Assignment(*row) for row in rows]
+
+def build_subcalendar(rows):
+    subcalendar = Subcalendar("bench")
+    subcalendar.assignments = [Assignment(*row) for row in rows]
+    return subcalendar
+
+def main():
+    parser = argparse.ArgumentParser(description="measure Assignment construction time and memory")
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    rows = make_rows(args.count)
+    print(f"{args.count} assignments")
+    print(f"{'':<28}{'time':>10}{'memory':>14}")
+    for label, build in (
+        ("legacy (dict + strptime)", build_legacy),
+        ("Assignment (slots)", build_slotted),
+        ("Subcalendar (indexed)", build_subcalendar),
+    ):
+        measure(label, build, rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# bench_azure_read_all.py - startup time of AzureBlobStorageBackend.read_all vs. blob count
+#
+# runs against an in-memory container that sleeps for a simulated round trip on every call:
+#   python -m benchmarks.bench_azure_read_all --latency 0.02 --counts 10 50 100
+
+import argparse
+import time
+
+from storage.azure_blob import AzureBlobStorageBackend
+from tests.fake_azure import FakeContainerClient
+
+def make_blobs(count: int, assignments: int = 50) -> dict:
+    blobs = {}
+    for i in range(count):
+        lines = [str(i % 5 + 1)]
+        for j in range(assignments):
+            lines.append(f"assignment {j},2025{j % 12 + 1:02d}{j % 28 + 1:02d},{j % 2},{j % 90}")
+        blobs[f"subcal{i:04d}"] = "\n".join(lines).encode("utf-8")
+    return blobs
+
+def main():
+    parser = argparse.ArgumentParser(description="time AzureBlobStorageBackend.read_all against a simulated container")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated round trip in seconds")
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    print(f"latency {args.latency * 1000:.0f} ms per call")
+    print(f"{'blobs':>6}" + "".join(f"{f'c={c}':>10}" for c in args.concurrency))
+    for count in args.counts:
+        container = FakeContainerClient(make_blobs(count), latency=args.latency)
+        row = f"{count:>6}"
+        for concurrency in args.concurrency:
+            storage = AzureBlobStorageBackend(container, read_concurrency=concurrency)
+            start = time.perf_counter()
+            storage.read_all()
+            row += f"{time.perf_counter() - start:>9.3f}s"
+        print(row)
+
+if __name__ == "__main__":
+    main()
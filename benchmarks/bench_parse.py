@@ -0,0 +1,62 @@
+# bench_parse.py - throughput of the subcalendar text parser on synthetic files
+#
+#   python -m benchmarks.bench_parse --lines 100000
+
+import argparse
+import random
+import time
+from datetime import date
+from io import StringIO
+
+from subcalendar import Assignment, Subcalendar
+
+def make_text(lines: int, shuffled: bool = False) -> str:
+    first = date(2015, 1, 1).toordinal()
+    rows = []
+    for i in range(lines):
+        d = date.fromordinal(first + i * 3650 // lines)
+        rows.append(f"assignment {i % 500},{d.year:04d}{d.month:02d}{d.day:02d},{i % 2},{i % 120}")
+    if shuffled:
+        random.Random(0).shuffle(rows)
+    return "1\n" + "\n".join(rows)
+
+# the previous line by line parser: a readline loop building and inserting one assignment per row.
+# it runs on today's Assignment and bisect insert, so this understates the gain over the original
+# strptime and linear insert version (which would take minutes at 100k lines)
+def parse_per_line(name: str, text: str) -> Subcalendar:
+    subcalendar = Subcalendar(name)
+    file = StringIO(text)
+    subcalendar.color = int(file.readline().strip())
+    for line in file:
+        parts = line.strip().split(",")
+        if len(parts) >= 3:
+            assignment = Assignment(parts[0], parts[1], int(parts[2]), int(parts[3]) if len(parts) > 3 else 0)
+            subcalendar.insert_assignment(assignment)
+    return subcalendar
+
+def bulk_parse(name: str, text: str) -> Subcalendar:
+    return Subcalendar.parse(name, text)[0]
+
+def best_of(runs: int, fn, *args) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="compare the per-line and bulk subcalendar parsers")
+    parser.add_argument("--lines", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.lines} lines, best of {args.runs}")
+    for label, shuffled in (("sorted file", False), ("unsorted file", True)):
+        text = make_text(args.lines, shuffled)
+        old = best_of(args.runs, parse_per_line, "bench", text)
+        new = best_of(args.runs, bulk_parse, "bench", text)
+        print(f"{label:<15} per-line {args.lines / old:>10,.0f} lines/s   bulk {args.lines / new:>10,.0f} lines/s   {old / new:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# bench_save.py - latency of saving every subcalendar with the local backend
+#
+#   python -m benchmarks.bench_save --subcalendars 100 --assignments 200
+#
+# compares the old unbuffered per-file writes, atomic writes one subcalendar at a time,
+# and the batched commit used by write_dirty. the atomic versions fsync, so the
+# numbers depend heavily on the disk
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+
+from storage.local import LocalStorageBackend
+from subcalendar import Assignment, Subcalendar
+
+def make_subcalendars(count: int, assignments: int):
+    first = date(2024, 1, 1).toordinal()
+    subcalendars = []
+    for i in range(count):
+        subcalendar = Subcalendar(f"subcalendar {i}", i % 7 + 1)
+        subcalendar.assignments = [
+            Assignment(f"assignment {j}", date.fromordinal(first + j * 3).strftime("%Y%m%d"), j % 2, j % 90)
+            for j in range(assignments)
+        ]
+        subcalendars.append(subcalendar)
+    return subcalendars
+
+# write_local before atomic writes: open with "w" and one write call per line
+def write_streaming(subcalendars, directory):
+    for subcalendar in subcalendars:
+        with open(os.path.join(directory, subcalendar.name), "w") as file:
+            file.write(f"{subcalendar.color}\n")
+            for a in subcalendar.assignments:
+                file.write(f"{a.name},{a.date_str},{int(a.completed)},{a.studytime}\n")
+
+def write_each(subcalendars, directory):
+    for subcalendar in subcalendars:
+        subcalendar.write_local(directory)
+
+def write_batched(subcalendars, directory):
+    LocalStorageBackend(directory).write_many(subcalendars)
+
+def median_ms(runs: int, fn, subcalendars, directory) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(subcalendars, directory)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="time saving subcalendars with the local backend")
+    parser.add_argument("--subcalendars", type=int, default=100)
+    parser.add_argument("--assignments", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--dir", help="directory to write in (default: a temporary directory)")
+    args = parser.parse_args()
+
+    subcalendars = make_subcalendars(args.subcalendars, args.assignments)
+    print(f"{args.subcalendars} subcalendars x {args.assignments} assignments, median of {args.runs}")
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        for label, fn in (("streaming (old, not crash safe)", write_streaming),
+                          ("atomic, one at a time", write_each),
+                          ("atomic, batched commit", write_batched)):
+            print(f"{label:<32} {median_ms(args.runs, fn, subcalendars, directory):8.1f} ms")
+
+if __name__ == "__main__":
+    main()
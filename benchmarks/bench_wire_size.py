@@ -0,0 +1,33 @@
+# bench_wire_size.py - bytes sent for GET /subcalendars per shape and content coding
+#
+#   python -m benchmarks.bench_wire_size --subcalendars 20 --assignments 2000 --years 5
+
+import argparse
+import json
+
+import compression
+from benchmarks.synthetic import make_subcalendars
+
+def main():
+    parser = argparse.ArgumentParser(description="compare response sizes of the full and columnar shapes, raw and compressed")
+    parser.add_argument("--subcalendars", type=int, default=20)
+    parser.add_argument("--assignments", type=int, default=2000, help="per subcalendar")
+    parser.add_argument("--years", type=int, default=5)
+    args = parser.parse_args()
+
+    subcalendars = make_subcalendars(args.subcalendars, args.assignments, args.years)
+    shapes = {
+        "full": [sc.to_dict() for sc in subcalendars],
+        "columnar": [sc.to_columns() for sc in subcalendars],
+    }
+    baseline = None
+    print(f"{args.subcalendars} subcalendars x {args.assignments} assignments over {args.years} years")
+    for shape, data in shapes.items():
+        payload = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        for encoding in [None] + compression.available():
+            size = len(payload) if encoding is None else len(compression.compress(payload, encoding))
+            baseline = baseline or size
+            print(f"{shape:<9} {encoding or 'identity':<9} {size:>12,} bytes  {baseline / size:6.1f}x smaller")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+# headless_curses.py - lets the UI draw without a terminal, for benchmarks
+#
+# install() replaces the curses calls the UI makes with windows that accept and drop every call,
+# so timings cover the UI's own work rather than terminal output. tests can set `record = True` on a
+# window to keep (name, args) of every call in `history`
+
+import curses
+
+class HeadlessWindow:
+    def __init__(self, height: int, width: int):
+        self.height = height
+        self.width = width
+        self.calls = 0
+        self.keys = []  # returned by getch in order, then ESC
+        self.record = False
+        self.history = []
+
+    def getmaxyx(self):
+        return self.height, self.width
+
+    def getch(self):
+        return self.keys.pop(0) if self.keys else 27
+
+    def getstr(self, *args):
+        return b""
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls += 1
+            if self.record:
+                self.history.append((name, args))
+        return call
+
+def install(height: int = 50, width: int = 160) -> HeadlessWindow:
+    """Patch the curses module for headless use and return a window to pass to UI as stdscr."""
+    for name in ("start_color", "use_default_colors", "init_pair", "curs_set", "echo", "noecho"):
+        setattr(curses, name, lambda *args: None)
+    curses.color_pair = lambda n: 0
+    curses.newwin = lambda h, w, *args: HeadlessWindow(h, w)
+    curses.ACS_HLINE = curses.ACS_VLINE = ord("-")
+    return HeadlessWindow(height, width)
@@ -0,0 +1,133 @@
+# load_test.py - requests/sec and latency of GET /subcalendars under concurrent load
+#
+# against a running server:
+#   python -m benchmarks.load_test --url http://127.0.0.1:8000/subcalendars --concurrency 16 --duration 10
+# or start serve.py on generated data first and compare worker counts:
+#   python -m benchmarks.load_test --spawn 1 2 4 --subcalendars 50 --assignments 500
+#
+# every client thread keeps one connection alive, like a browser would
+
+import argparse
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from benchmarks.synthetic import make_subcalendars, write_directory
+
+def client(url, deadline: float, headers: dict, latencies: list, errors: list):
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    conn = None
+    while time.perf_counter() < deadline:
+        if conn is None:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status not in (200, 304):
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = None
+            continue
+        latencies.append(time.perf_counter() - start)
+    if conn is not None:
+        conn.close()
+
+def run(url: str, concurrency: int, duration: float, headers: dict) -> dict:
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=client, args=(url, deadline, headers, latencies, errors)) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000 if latencies else 0.0
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+    }
+
+def report(label: str, result: dict):
+    print(f"{label:<12} {result['rps']:>9.1f} req/s  p50 {result['p50_ms']:7.2f} ms  p95 {result['p95_ms']:7.2f} ms  "
+          f"p99 {result['p99_ms']:7.2f} ms  ({result['requests']} requests, {result['errors']} errors)")
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for(url: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    parts = urllib.parse.urlsplit(url)
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port, timeout=2)
+            conn.request("GET", "/metrics")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"server at {url} did not come up")
+
+# serve.py with the local backend, HOME pointed at a directory holding the generated subcalendars
+def spawn_server(workers: int, threads: int, home: str):
+    port = free_port()
+    env = dict(os.environ, HOME=home, CALICULA_STORAGE_BACKEND="local",
+               CALICULA_SHARED_CACHE=os.path.join(home, f"shared-{port}.db"))
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "serve.py"), "--workers", str(workers), "--threads", str(threads), "--port", str(port)],
+                              env=env, stderr=subprocess.DEVNULL)
+    return server, f"http://127.0.0.1:{port}"
+
+def main():
+    parser = argparse.ArgumentParser(description="load test GET /subcalendars")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/subcalendars")
+    parser.add_argument("--concurrency", type=int, default=16, help="client threads, one keep-alive connection each")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per run")
+    parser.add_argument("--gzip", action="store_true", help="send Accept-Encoding: gzip")
+    parser.add_argument("--spawn", type=int, nargs="+", metavar="WORKERS",
+                        help="start serve.py with each of these worker counts on generated data instead of using --url")
+    parser.add_argument("--threads", type=int, default=4, help="threads per spawned worker")
+    parser.add_argument("--subcalendars", type=int, default=50)
+    parser.add_argument("--assignments", type=int, default=500)
+    args = parser.parse_args()
+
+    headers = {"Accept-Encoding": "gzip"} if args.gzip else {}
+    print(f"GET /subcalendars, {args.concurrency} connections, {args.duration:.0f} s per run")
+    if not args.spawn:
+        report(args.url, run(args.url, args.concurrency, args.duration, headers))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_directory(make_subcalendars(args.subcalendars, args.assignments), os.path.join(directory, ".local", "share", "subcalendars"))
+        for workers in args.spawn:
+            server, base = spawn_server(workers, args.threads, directory)
+            try:
+                wait_for(base)
+                report(f"{workers} worker{'s' if workers > 1 else ''}", run(base + "/subcalendars", args.concurrency, args.duration, headers))
+            finally:
+                server.terminate()
+                server.wait()
+
+if __name__ == "__main__":
+    main()
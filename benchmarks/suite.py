@@ -0,0 +1,178 @@
+# suite.py - timings for the load, render, query and save paths on synthetic data
+#
+#   python -m benchmarks.suite --subcalendars 50 --assignments 500 --out results.json
+#   python -m benchmarks.suite --compare results.json
+#
+# every case is timed `--repeat` times and summarized as median/min/max in milliseconds.
+# results are saved as json along with the commit and parameters, and --compare prints the change
+# against an earlier file and exits nonzero if any case got slower than --threshold.
+# the ui cases draw into a headless curses stub (see headless_curses.py)
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+from benchmarks import headless_curses
+from benchmarks.synthetic import make_subcalendars, write_directory
+from subcalendar import Assignment, Subcalendar
+
+def measure(fn, repeat: int, setup=None) -> dict:
+    """Time fn() repeat times, running setup() untimed before each call."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": statistics.median(times), "min_ms": min(times), "max_ms": max(times), "runs": repeat}
+
+def storage_cases(subcalendars, directory: str, repeat: int) -> dict:
+    results = {}
+    write_directory(subcalendars, directory)
+    results["read_all_local"] = measure(lambda: Subcalendar.read_all_local(directory), repeat)
+
+    blobs = [(sc.name, sc.to_blob()) for sc in subcalendars]
+    results["from_blob"] = measure(lambda: [Subcalendar.from_blob(name, data) for name, data in blobs], repeat)
+
+    out = os.path.join(directory, "write")
+    os.makedirs(out)
+    results["write_local"] = measure(lambda: [sc.write_local(out) for sc in subcalendars], repeat)
+
+    # 1000 inserts spread over the dates of the largest subcalendar, removed again between runs
+    target = max(subcalendars, key=lambda sc: len(sc.assignments))
+    existing = target.assignments
+    new = [Assignment(f"inserted {i}", existing[i * len(existing) // 1000].date_str, False, 30) for i in range(1000)]
+    def insert():
+        for a in new:
+            target.insert_assignment(a)
+    results["insert_assignment_x1000"] = measure(insert, repeat, setup=lambda: target.remove_assignments(new))
+    target.remove_assignments(new)
+    return results
+
+def ui_cases(subcalendars, repeat: int) -> dict:
+    try:
+        from ui import UI
+    except SyntaxError as e:  # ui.py needs a newer python than the one running the suite
+        return {"ui": {"skipped": f"ui.py does not compile on python {platform.python_version()}: {e.msg}"}}
+
+    class NullStorage:
+        name = "bench"
+
+    stdscr = headless_curses.install()
+    ui = UI(stdscr, NullStorage())
+    middle = date(2025, 6, 15)
+    ui.working_year, ui.working_month, ui.selected_day = middle.year, middle.month - 1, middle.day
+
+    results = {}
+    results["draw_calendar_base"] = measure(ui.draw_calendar_base, repeat)
+    results["draw_assignments_cold"] = measure(lambda: ui.draw_assignments(subcalendars), repeat, setup=ui.invalidate_month_cache)
+    results["draw_assignments_cached"] = measure(lambda: ui.draw_assignments(subcalendars), repeat)
+    week = ui.get_selected_week_start()
+    results["sum_studytime_for_week_x1000"] = measure(lambda: [ui.sum_studytime_for_week(subcalendars, week) for _ in range(1000)], repeat)
+    return results
+
+def flask_cases(subcalendars, directory: str, repeat: int) -> dict:
+    import app as app_module
+    from storage.local import LocalStorageBackend
+
+    data = os.path.join(directory, "flask")
+    write_directory(subcalendars, data)
+    original = app_module.storage
+    app_module.storage = LocalStorageBackend(data)
+    app_module.cache.invalidate()
+    client = app_module.app.test_client()
+    body = {"name": "posted", "color": 2, "assignments": [a.to_dict() for a in subcalendars[0].assignments]}
+
+    results = {}
+    try:
+        results["GET /subcalendars cold"] = measure(lambda: client.get("/subcalendars").data, repeat, setup=app_module.cache.invalidate)
+        results["GET /subcalendars cached"] = measure(lambda: client.get("/subcalendars").data, repeat)
+        results["POST /subcalendars"] = measure(lambda: client.post("/subcalendars", json=body), repeat)
+        results["GET /assignments month"] = measure(lambda: client.get("/assignments?from=20250601&to=20250630").data, repeat)
+    finally:
+        app_module.storage = original
+        app_module.cache.invalidate()
+    return results
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+# prints the change of every case against an earlier run, returns the cases slower by more than threshold
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    print(f"\ncompared with {baseline.get('commit', '?')} ({baseline.get('timestamp', '?')})")
+    for group, cases in results["results"].items():
+        for case, timing in cases.items():
+            old = baseline.get("results", {}).get(group, {}).get(case)
+            if "median_ms" not in timing or not old or "median_ms" not in old:
+                continue
+            change = timing["median_ms"] / old["median_ms"] - 1 if old["median_ms"] else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{group}/{case}")
+            print(f"{group + '/' + case:<45} {old['median_ms']:10.3f} -> {timing['median_ms']:10.3f} ms  {change:+7.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="time calicula's load, render, query and save paths on synthetic data")
+    parser.add_argument("--subcalendars", type=int, default=50)
+    parser.add_argument("--assignments", type=int, default=500, help="per subcalendar")
+    parser.add_argument("--years", type=int, default=3, help="span the due dates are spread over")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", choices=("storage", "ui", "flask"), default=("storage", "ui", "flask"))
+    parser.add_argument("--out", help="write results to this json file")
+    parser.add_argument("--compare", help="json results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown reported as a regression (default 0.10 = 10%%)")
+    args = parser.parse_args()
+
+    subcalendars = make_subcalendars(args.subcalendars, args.assignments, args.years)
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {"subcalendars": args.subcalendars, "assignments": args.assignments, "years": args.years, "repeat": args.repeat},
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        if "storage" in args.only:
+            results["results"]["storage"] = storage_cases(subcalendars, os.path.join(directory, "storage"), args.repeat)
+        if "ui" in args.only:
+            results["results"]["ui"] = ui_cases(subcalendars, args.repeat)
+        if "flask" in args.only:
+            results["results"]["flask"] = flask_cases(subcalendars, directory, args.repeat)
+
+    print(f"{args.subcalendars} subcalendars x {args.assignments} assignments over {args.years} years, "
+          f"median of {args.repeat} (commit {results['commit']}, python {results['python']})")
+    for group, cases in results["results"].items():
+        for case, timing in cases.items():
+            if "median_ms" in timing:
+                print(f"{group + '/' + case:<45} {timing['median_ms']:10.3f} ms  (min {timing['min_ms']:.3f}, max {timing['max_ms']:.3f})")
+            else:
+                print(f"{group + '/' + case:<45} skipped: {timing['skipped']}")
+
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"\nwrote {args.out}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# synthetic.py - generated subcalendars for the benchmarks
+
+import os
+import random
+from datetime import date
+from typing import List
+
+from subcalendar import Assignment, Subcalendar
+
+# count subcalendars of `assignments` each, due on random days over `years` years starting in start_year
+def make_subcalendars(count: int, assignments: int, years: int = 3, start_year: int = 2024, seed: int = 0) -> List[Subcalendar]:
+    rng = random.Random(seed)
+    first = date(start_year, 1, 1).toordinal()
+    span = date(start_year + years, 1, 1).toordinal() - first
+    subcalendars = []
+    for i in range(count):
+        subcalendar = Subcalendar(f"subcalendar{i:04d}", i % 7 + 1)
+        subcalendar.assignments = [
+            Assignment(f"assignment {j}", date.fromordinal(first + rng.randrange(span)).strftime("%Y%m%d"),
+                       rng.random() < 0.5, rng.choice((0, 15, 30, 45, 60, 90)))
+            for j in range(assignments)
+        ]
+        subcalendar.mark_clean()
+        subcalendars.append(subcalendar)
+    return subcalendars
+
+# the subcalendars as local storage files in directory
+def write_directory(subcalendars: List[Subcalendar], directory: str):
+    os.makedirs(directory, exist_ok=True)
+    for subcalendar in subcalendars:
+        subcalendar.write_local(directory)
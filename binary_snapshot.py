@@ -0,0 +1,169 @@
+# binary_snapshot.py - compact binary subcalendar format, read through mmap
+#
+# layout (little endian):
+#   header   magic "CLSB", version u16, color u16, flags u16 (bit 0 = hidden), reserved u16,
+#            record count u32, string table offset u64, string table size u64
+#   records  one fixed-width 16 byte record per assignment, sorted by due date:
+#            due date ordinal i32, name offset u32, name length u16, completed u8, pad, studytime i32
+#   strings  utf-8 assignment names, each distinct name stored once
+#
+# records are sorted, so a date range is found by binary search over the mapped file and only the
+# records in that range are decoded.
+#
+# conversion between this and the text format:
+#   python binary_snapshot.py to-binary ~/.local/share/subcalendars ~/.local/share/calicula/binary
+#   python binary_snapshot.py to-text ~/.local/share/calicula/binary ~/.local/share/subcalendars
+
+import argparse
+import mmap
+import os
+import struct
+from datetime import date
+from typing import List
+
+from subcalendar import Assignment, Subcalendar
+from utils import write_atomic
+
+MAGIC = b"CLSB"
+VERSION = 1
+EXTENSION = ".clsb"
+HEADER = struct.Struct("<4sHHHHIQQ")
+RECORD = struct.Struct("<iIHBxi")
+FLAG_HIDDEN = 1
+
+def encode(subcalendar: Subcalendar) -> bytes:
+    assignments = subcalendar.assignments
+    records = bytearray(RECORD.size * len(assignments))
+    strings = bytearray()
+    offsets = {}
+    for i, a in enumerate(assignments):
+        span = offsets.get(a.name)
+        if span is None:
+            data = a.name.encode("utf-8")
+            if len(data) > 0xFFFF:
+                raise ValueError(f"assignment name too long: {a.name[:20]}...")
+            span = offsets[a.name] = (len(strings), len(data))
+            strings += data
+        RECORD.pack_into(records, i * RECORD.size, a.ordinal, span[0], span[1], 1 if a.completed else 0, a.studytime)
+
+    strings_offset = HEADER.size + len(records)
+    flags = FLAG_HIDDEN if subcalendar.hidden else 0
+    header = HEADER.pack(MAGIC, VERSION, subcalendar.color, flags, 0, len(assignments), strings_offset, len(strings))
+    return header + records + strings
+
+def write(subcalendar: Subcalendar, path: str):
+    write_atomic(path, encode(subcalendar))
+
+class BinarySnapshot:
+    """A memory mapped binary subcalendar. Opening it reads only the header, records are decoded on demand."""
+
+    def __init__(self, path: str, name: str = None):
+        self.path = path
+        self.name = name if name is not None else os.path.basename(path)[:-len(EXTENSION)]
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.color, flags, _, self.count, self.strings_offset, _ = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError(f"{path} is not a version {VERSION} calicula binary snapshot")
+        self.hidden = bool(flags & FLAG_HIDDEN)
+        self.names = {}  # string table offset -> decoded name
+
+    def close(self):
+        self.map.close()
+
+    def _ordinal(self, index: int) -> int:
+        return struct.unpack_from("<i", self.map, HEADER.size + index * RECORD.size)[0]
+
+    # first record index whose due date is >= ordinal (or > ordinal when right is set)
+    def _bisect(self, ordinal: int, right: bool = False) -> int:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = self._ordinal(mid)
+            if value < ordinal or (right and value == ordinal):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _decode(self, lo: int, hi: int) -> List[Assignment]:
+        names = self.names
+        strings_offset = self.strings_offset
+        start = HEADER.size + lo * RECORD.size
+        view = memoryview(self.map)[start:HEADER.size + hi * RECORD.size]
+        assignments = []
+        new = Assignment.__new__
+        try:
+            for ordinal, offset, length, completed, studytime in RECORD.iter_unpack(view):
+                name = names.get(offset)
+                if name is None:
+                    begin = strings_offset + offset
+                    name = names[offset] = self.map[begin:begin + length].decode("utf-8")
+                a = new(Assignment)
+                a.name = name
+                a.ordinal = ordinal
+                a.completed = completed
+                a.studytime = studytime
+                assignments.append(a)
+        finally:
+            view.release()
+        return assignments
+
+    def assignments_between(self, start: date, end: date) -> List[Assignment]:
+        lo = self._bisect(start.toordinal())
+        hi = self._bisect(end.toordinal(), right=True)
+        return self._decode(lo, max(lo, hi))
+
+    def metadata(self) -> Subcalendar:
+        subcalendar = Subcalendar(self.name, self.color)
+        subcalendar.hidden = self.hidden
+        subcalendar.mark_clean()
+        return subcalendar
+
+    def to_subcalendar(self) -> Subcalendar:
+        subcalendar = self.metadata()
+        subcalendar.assignments = self._decode(0, self.count)
+        subcalendar.mark_clean()
+        return subcalendar
+
+def read(path: str) -> Subcalendar:
+    snapshot = BinarySnapshot(path)
+    try:
+        return snapshot.to_subcalendar()
+    finally:
+        snapshot.close()
+
+# ---- CONVERSION ----
+def text_to_binary(src_dir: str, dst_dir: str) -> int:
+    os.makedirs(dst_dir, exist_ok=True)
+    subcalendars = Subcalendar.read_all_local(src_dir)
+    for subcalendar in subcalendars:
+        write(subcalendar, os.path.join(dst_dir, subcalendar.name + EXTENSION))
+    return len(subcalendars)
+
+def binary_to_text(src_dir: str, dst_dir: str) -> int:
+    os.makedirs(dst_dir, exist_ok=True)
+    count = 0
+    for filename in sorted(os.listdir(src_dir)):
+        if filename.endswith(EXTENSION):
+            read(os.path.join(src_dir, filename)).write_local(dst_dir)
+            count += 1
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="convert subcalendars between the text and binary formats")
+    parser.add_argument("direction", choices=["to-binary", "to-text"])
+    parser.add_argument("src", help="directory to read")
+    parser.add_argument("dst", help="directory to write")
+    args = parser.parse_args()
+
+    src, dst = os.path.expanduser(args.src), os.path.expanduser(args.dst)
+    if args.direction == "to-binary":
+        count = text_to_binary(src, dst)
+    else:
+        count = binary_to_text(src, dst)
+    print(f"converted {count} subcalendars")
+
+if __name__ == "__main__":
+    main()
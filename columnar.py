@@ -0,0 +1,132 @@
+# columnar.py - column arrays over loaded assignments for vectorized aggregates (needs numpy, optional)
+
+from datetime import date
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from subcalendar import Subcalendar
+
+def available() -> bool:
+    return np is not None
+
+class ColumnarSnapshot:
+    """Parallel numpy arrays of every loaded assignment, sorted by due date:
+    ordinal (date ordinal), month (year * 12 + zero-based month), subcal (index into names),
+    minutes (study time) and completed.
+
+    Columns are built per subcalendar and cached against its version, so refresh() only rebuilds
+    the subcalendars that changed before stitching the blocks back together.
+    """
+
+    def __init__(self):
+        if np is None:
+            raise RuntimeError("numpy is required for the columnar snapshot")
+        self.blocks = {}  # name -> (subcalendar, version, columns)
+        self.names: List[str] = []
+        self.hidden = np.zeros(0, dtype=bool)
+        self.ordinal = np.zeros(0, dtype=np.int32)
+        self.month = np.zeros(0, dtype=np.int32)
+        self.subcal = np.zeros(0, dtype=np.int32)
+        self.minutes = np.zeros(0, dtype=np.int32)
+        self.completed = np.zeros(0, dtype=bool)
+
+    @staticmethod
+    def _columns(subcalendar: Subcalendar):
+        assignments = subcalendar.assignments
+        n = len(assignments)
+        ordinal = np.fromiter((a.ordinal for a in assignments), dtype=np.int32, count=n)
+        minutes = np.fromiter((a.studytime for a in assignments), dtype=np.int32, count=n)
+        completed = np.fromiter((bool(a.completed) for a in assignments), dtype=bool, count=n)
+        # year and month for each distinct due date, not each assignment
+        days, inverse = np.unique(ordinal, return_inverse=True)
+        months = np.array([d.year * 12 + d.month - 1 for d in map(date.fromordinal, days.tolist())], dtype=np.int32)
+        month = months[inverse] if n else np.zeros(0, dtype=np.int32)
+        return ordinal, month, minutes, completed
+
+    # bring the arrays up to date with the given subcalendars. returns True if anything was rebuilt
+    def refresh(self, subcalendars: List[Subcalendar]) -> bool:
+        changed = [sc.name for sc in subcalendars] != self.names
+        blocks = {}
+        for sc in subcalendars:
+            block = self.blocks.get(sc.name)
+            if block is None or block[0] is not sc or block[1] != sc.version:
+                block = (sc, sc.version, self._columns(sc))
+                changed = True
+            blocks[sc.name] = block
+        self.blocks = blocks
+        self.hidden = np.array([sc.hidden for sc in subcalendars], dtype=bool)
+        if not changed:
+            return False
+
+        self.names = [sc.name for sc in subcalendars]
+        columns = [blocks[name][2] for name in self.names]
+        if not columns:
+            self.__init__()
+            return True
+        ordinal = np.concatenate([c[0] for c in columns])
+        # each block is already in date order, a stable sort keeps same-day assignments in subcalendar order
+        order = np.argsort(ordinal, kind="stable")
+        self.ordinal = ordinal[order]
+        self.month = np.concatenate([c[1] for c in columns])[order]
+        self.minutes = np.concatenate([c[2] for c in columns])[order]
+        self.completed = np.concatenate([c[3] for c in columns])[order]
+        self.subcal = np.repeat(np.arange(len(columns), dtype=np.int32), [len(c[0]) for c in columns])[order]
+        return True
+
+    # row slice and mask for assignments due between start and end
+    def _select(self, start: date, end: date, names: Optional[List[str]], include_hidden: bool):
+        lo = int(np.searchsorted(self.ordinal, start.toordinal(), side="left"))
+        hi = int(np.searchsorted(self.ordinal, end.toordinal(), side="right"))
+        if names is None:
+            allowed = np.ones(len(self.names), dtype=bool) if include_hidden else ~self.hidden
+        else:
+            allowed = np.isin(np.array(self.names, dtype=object), list(names))
+            if not include_hidden:
+                allowed &= ~self.hidden
+        mask = allowed[self.subcal[lo:hi]] if len(self.names) else np.zeros(hi - lo, dtype=bool)
+        return lo, hi, mask
+
+    def totals(self, start: date, end: date, names: Optional[List[str]] = None, include_hidden: bool = False) -> Dict[str, int]:
+        lo, hi, mask = self._select(start, end, names, include_hidden)
+        return {
+            "count": int(mask.sum()),
+            "completed": int(self.completed[lo:hi][mask].sum()),
+            "studytime": int(self.minutes[lo:hi][mask].sum()),
+        }
+
+    def grouped(self, start: date, end: date, by: str = "day", names: Optional[List[str]] = None,
+                include_hidden: bool = False) -> List[Dict]:
+        """Counts, completed counts and study minutes per day, week (starting monday) or month in [start, end]."""
+        if start > end:
+            return []
+        lo, hi, mask = self._select(start, end, names, include_hidden)
+        ordinal = self.ordinal[lo:hi][mask]
+        if by == "day":
+            base = start.toordinal()
+            keys = ordinal - base
+            size = end.toordinal() - base + 1
+            label = lambda k: date.fromordinal(base + k).isoformat()
+        elif by == "week":
+            base = start.toordinal() - (start.toordinal() + 6) % 7  # monday of the first week
+            keys = (ordinal - base) // 7
+            size = (end.toordinal() - base) // 7 + 1
+            label = lambda k: date.fromordinal(base + 7 * k).isoformat()
+        elif by == "month":
+            base = start.year * 12 + start.month - 1
+            keys = self.month[lo:hi][mask] - base
+            size = end.year * 12 + end.month - 1 - base + 1
+            label = lambda k: f"{(base + k) // 12:04d}-{(base + k) % 12 + 1:02d}"
+        else:
+            raise ValueError(f"unknown grouping: {by}")
+
+        count = np.bincount(keys, minlength=size)
+        completed = np.bincount(keys, weights=self.completed[lo:hi][mask], minlength=size)
+        minutes = np.bincount(keys, weights=self.minutes[lo:hi][mask], minlength=size)
+        return [
+            {"period": label(k), "count": int(count[k]), "completed": int(completed[k]), "studytime": int(minutes[k])}
+            for k in np.flatnonzero(count).tolist()
+        ]
@@ -0,0 +1,52 @@
+# compression.py - response body compression for the web app
+#
+# gzip is always available. brotli is used when the optional brotli package is installed
+
+import gzip
+import zlib
+from typing import Iterable, Iterator, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MIN_SIZE = 1024  # smaller bodies aren't worth compressing
+COMPRESSIBLE = ("application/json", "application/x-ndjson", "application/javascript", "text/")
+
+def available() -> list:
+    """Supported content codings, preferred first."""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+def negotiate(accept_encoding) -> Optional[str]:
+    """Pick a coding from a werkzeug Accept-Encoding header, or None to send the body as is."""
+    return accept_encoding.best_match(available())
+
+def compressible(mimetype: Optional[str]) -> bool:
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE)
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=5)  # much faster than the default 11, still smaller than gzip
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    raise ValueError(f"unsupported encoding {encoding!r}")
+
+# compress a streamed body chunk by chunk. each chunk is flushed so the client can decode it on arrival
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=5)
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    elif encoding == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 writes a gzip header and trailer
+        for chunk in chunks:
+            data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    else:
+        raise ValueError(f"unsupported encoding {encoding!r}")
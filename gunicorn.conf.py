@@ -0,0 +1,21 @@
+# gunicorn.conf.py - gunicorn -c gunicorn.conf.py wsgi:app
+
+import multiprocessing
+import os
+
+bind = os.getenv("CALICULA_BIND", "127.0.0.1:8000")
+workers = int(os.getenv("CALICULA_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("CALICULA_THREADS", "4"))
+worker_class = "gthread"
+keepalive = 5
+graceful_timeout = 30
+
+# not preloaded, so every worker imports the app after the fork and opens its own storage connections
+preload_app = False
+
+def post_worker_init(worker):
+    from wsgi import warm_up
+    try:
+        warm_up()
+    except Exception as e:  # a worker that can't reach storage yet still serves, and loads on the first request
+        worker.log.warning(f"warm up failed: {e}")
@@ -1,40 +1,77 @@
 # main.py
 
 import curses
+from contextlib import nullcontext
+from profiling import stats_file, timings
 from ui import UI
-from storage import get_backend
+from storage import (Autosaver, WindowedStorage, autosave_enabled, get_autosave_delay, get_backend,
+                     get_lazy_max_months, lazy_load_enabled)
 from subcalendar import Subcalendar
 
 def main(stdscr):
     storage = get_backend()
+    # without indexed queries every month fetched would read the whole archive, so load it once instead
+    lazy = lazy_load_enabled() and storage.indexed_queries
+    if lazy:
+        storage = WindowedStorage(storage, max_months=get_lazy_max_months())
     ui = UI(stdscr, storage)
+    if lazy_load_enabled() and not lazy:
+        ui.msg = f"lazy_load ignored: {storage.name} storage can't query by date, use sqlite or binary"
 
-    subcalendars = storage.read_all()
+    # nothing to show until this arrives, but it keeps the slow part off the ui thread like every other storage call
+    ui.promptwin.addstr(0, 0, f"Loading subcalendars from {storage.name}...")
+    ui.promptwin.refresh()
+    subcalendars = ui.io.read_all().result()
     if not subcalendars:
         default = Subcalendar("default", 1)
         subcalendars.append(default)
         storage.write(default)
+        default.mark_clean()
+
+    # the autosave thread writes copies taken under ui's lock, which is only released while waiting for a key
+    autosaver = Autosaver(storage, subcalendars, get_autosave_delay()) if autosave_enabled() else None
+    ui.autosaver = autosaver
 
     running = True
     update_view = True
 
     stdscr.refresh()
 
-    while running:
-        if update_view:
-            ui.draw_calendar_base()
-            ui.draw_assignments(subcalendars)
-            ui.mainwin.refresh()
-            ui.update_counter += 1
-            update_view = False
+    with autosaver.lock if autosaver else nullcontext():
+        while running:
+            if update_view:
+                # fetch the months around the one being drawn. cached cells may point at unloaded assignments
+                if lazy:
+                    with timings.time("storage.load_window"):
+                        loaded = storage.load_window(subcalendars, ui.working_year, ui.working_month)
+                    if loaded:
+                        ui.invalidate_month_cache()
+                ui.draw_calendar_base()
+                ui.draw_assignments(subcalendars)
+                ui.mainwin.refresh()
+                ui.update_counter += 1
+                update_view = False
+            elif ui.dirty_days:
+                ui.draw_dirty_cells(subcalendars)
+
+            ui.draw_cursor()
 
-        ui.draw_cursor()
+            running, update_view = ui.prompt(subcalendars)
+            if autosaver:
+                autosaver.notify()
 
-        running, update_view = ui.prompt(subcalendars)
+    # save on exit (temporary). let queued storage operations and autosave finish first so this finds nothing left to write
+    ui.io.close()
+    if autosaver:
+        autosaver.close()
+        # renames its final save couldn't do. writing first would leave a copy under the old name too
+        for old_name, new_name in autosaver.renames:
+            storage.rename(old_name, new_name)
+    with timings.time("storage.write_dirty"):
+        storage.write_dirty(subcalendars)
 
-    # save on exit (temporary)
-    for cal in subcalendars:
-        storage.write(cal)
+    if stats_file():
+        timings.dump(stats_file())
 
 if __name__ == "__main__":
     curses.set_escdelay(1)
@@ -0,0 +1,86 @@
+# profiling.py - rolling latency stats for the tui's hot paths
+#
+# wrap a function with @timed("name") or a block with `with timings.time("name"):`. each name keeps
+# a call count and its last WINDOW durations, from which p50/p95/p99 are computed on demand.
+# recording costs two perf_counter calls and a deque append, so it stays on all the time.
+# set CALICULA_STATS_FILE to a path to have main.py write the stats there on exit
+
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+WINDOW = 1000  # most recent calls kept per name
+
+class Timings:
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self.lock = threading.Lock()  # storage calls are timed on background threads
+        self.samples = {}  # name -> deque of durations in seconds
+        self.counts = {}  # name -> calls since start
+
+    def record(self, name: str, seconds: float):
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.window)
+                self.counts[name] = 0
+            samples.append(seconds)
+            self.counts[name] += 1
+
+    @contextmanager
+    def time(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counts.clear()
+
+    def summary(self) -> list:
+        """(name, calls, p50, p95, p99, max) per name, in milliseconds over the rolling window, slowest p95 first."""
+        with self.lock:
+            snapshot = [(name, self.counts[name], sorted(samples)) for name, samples in self.samples.items()]
+        rows = []
+        for name, calls, samples in snapshot:
+            def percentile(p):
+                return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+            rows.append((name, calls, percentile(0.50), percentile(0.95), percentile(0.99), samples[-1] * 1000))
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows
+
+    def report(self) -> str:
+        lines = [f"{'name':<32}{'calls':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+        for name, calls, p50, p95, p99, worst in self.summary():
+            lines.append(f"{name:<32}{calls:>8}{p50:>10.3f}{p95:>10.3f}{p99:>10.3f}{worst:>10.3f}")
+        return "\n".join(lines)
+
+    def dump(self, path: str):
+        with open(path, "a") as file:
+            file.write(f"calicula session ending {datetime.now().isoformat(timespec='seconds')}, last {self.window} calls per name\n")
+            file.write(self.report() + "\n\n")
+
+timings = Timings()
+
+def timed(name: str):
+    """Decorator recording every call of the function under name."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                timings.record(name, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+def stats_file() -> str:
+    return os.getenv("CALICULA_STATS_FILE")
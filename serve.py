@@ -0,0 +1,99 @@
+# serve.py - run the web app with a pool of worker processes, gunicorn style, without extra dependencies
+#
+#   python serve.py --workers 4 --threads 8 --port 8000
+#
+# the listening socket is opened once and every forked worker accepts on it with a threaded
+# werkzeug server. each worker imports wsgi (and so opens its own storage client) after the fork,
+# warms up, and is replaced if it dies. ctrl-c or SIGTERM stops them all. unix only
+
+import argparse
+import os
+import signal
+import socket
+import sys
+import time
+
+def run_worker(sock: socket.socket, host: str, port: int, threads: int):
+    from werkzeug.serving import ThreadedWSGIServer, make_server
+    from wsgi import app, warm_up
+
+    # stop by raising KeyboardInterrupt, which serve_forever treats as a clean shutdown
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    try:
+        warm_up()
+    except Exception as e:
+        print(f"worker {os.getpid()}: warm up failed: {e}", file=sys.stderr)
+    server = make_server(host, port, app, threaded=threads > 1, fd=sock.fileno())
+    if isinstance(server, ThreadedWSGIServer):
+        server.daemon_threads = True
+    print(f"worker {os.getpid()} serving on http://{host}:{port}", file=sys.stderr)
+    server.serve_forever()
+
+def spawn(sock, args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            run_worker(sock, args.host, args.port, args.threads)
+        except BaseException as e:
+            if not isinstance(e, KeyboardInterrupt):
+                print(f"worker {os.getpid()} failed: {e}", file=sys.stderr)
+                code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+def main():
+    parser = argparse.ArgumentParser(description="serve the web app from several worker processes")
+    parser.add_argument("--host", default=os.getenv("CALICULA_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("CALICULA_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("CALICULA_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--threads", type=int, default=int(os.getenv("CALICULA_THREADS", "4")), help="per worker")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs fork, run `flask --app wsgi run` or a windows wsgi server instead")
+
+    sock = socket.create_server((args.host, args.port), backlog=1024)
+    sock.set_inheritable(True)
+    workers = {spawn(sock, args) for _ in range(args.workers)}
+
+    stopping = False
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while not stopping:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            time.sleep(0.5)
+            continue
+        workers.discard(pid)
+        if not stopping:
+            print(f"worker {pid} exited with status {status}, starting a new one", file=sys.stderr)
+            time.sleep(1)  # don't spin if workers keep failing at start
+            workers.add(spawn(sock, args))
+
+    for pid in workers:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    for pid in workers:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    sock.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# shared_cache.py - the web app's serialized subcalendars, shared by its worker processes
+#
+# one row in a sqlite file holds the last payload read from storage, its etag and expiry, and a
+# generation that every write bumps. a worker whose own copy is older than the generation drops it,
+# and a worker with nothing loaded parses the shared payload instead of reading every subcalendar
+# from storage again. expiry uses wall clock time since it is compared across processes. write_lock
+# serializes writes across the workers
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Tuple
+from utils import file_lock
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    generation INTEGER NOT NULL,
+    etag TEXT,
+    payload BLOB,
+    expires REAL
+);
+INSERT OR IGNORE INTO shared (id, generation) VALUES (1, 0);
+"""
+
+class SharedCache:
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.local = threading.local()  # sqlite connections can't cross threads
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.local.conn = conn
+        return conn
+
+    def generation(self) -> int:
+        return self._connect().execute("SELECT generation FROM shared WHERE id = 1").fetchone()[0]
+
+    def load(self) -> Optional[Tuple[int, str, bytes, float]]:
+        """(generation, etag, payload, expires) if another worker stored a payload that hasn't expired."""
+        row = self._connect().execute("SELECT generation, etag, payload, expires FROM shared WHERE id = 1").fetchone()
+        if row[2] is None or row[3] <= time.time():
+            return None
+        return row
+
+    def store(self, generation: int, etag: str, payload: bytes, expires: float) -> bool:
+        """Share a payload read at the given generation. Ignored if a write has bumped the generation since."""
+        cursor = self._connect().execute(
+            "UPDATE shared SET etag = ?, payload = ?, expires = ? WHERE id = 1 AND generation = ?",
+            (etag, payload, expires, generation))
+        return cursor.rowcount == 1
+
+    def invalidate(self) -> int:
+        """Drop the shared payload after a write and return the new generation."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE shared SET generation = generation + 1, etag = NULL, payload = NULL, expires = NULL WHERE id = 1")
+            generation = conn.execute("SELECT generation FROM shared WHERE id = 1").fetchone()[0]
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return generation
+
+    def write_lock(self):
+        """Context manager held by a worker while it writes, exclusive across every process using this cache."""
+        return file_lock(self.path + ".lock")
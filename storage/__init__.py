@@ -4,6 +4,18 @@ import configparser
 import os
 from .local import LocalStorageBackend
 from .azure_blob import AzureBlobStorageBackend
+from .journal import JournalStorageBackend
+from .sqlite import SQLiteStorageBackend
+from .binary import BinaryStorageBackend
+from .windowed import WindowedStorage
+from .async_storage import AsyncStorage
+from .autosave import Autosaver, DEFAULT_AUTOSAVE_DELAY
+
+def _read_config():
+    config_path = os.path.expanduser("~/.config/calicula/config")
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    return config
 
 def get_backend():
     # try azure app service env variables
@@ -11,14 +23,40 @@ def get_backend():
 
     if backend_type is None:
         # fallback to config file for local development
-        config_path = os.path.expanduser("~/.config/calicula/config")
-        config = configparser.ConfigParser()
-        config.read(config_path)
-        backend_type = config.get("storage", "backend", fallback="local")
+        backend_type = _read_config().get("storage", "backend", fallback="local")
 
     backend_type = backend_type.lower()
 
     if backend_type == "azure":
         return AzureBlobStorageBackend()
+    elif backend_type == "journal":
+        return JournalStorageBackend()
+    elif backend_type == "sqlite":
+        return SQLiteStorageBackend()
+    elif backend_type == "binary":
+        return BinaryStorageBackend()
     else:
         return LocalStorageBackend()
+
+# tui only: keep a window of months in memory instead of the whole archive. best with the sqlite backend
+def lazy_load_enabled() -> bool:
+    value = os.getenv("CALICULA_LAZY_LOAD")
+    if value is None:
+        return _read_config().getboolean("storage", "lazy_load", fallback=False)
+    return value.lower() in ("1", "true", "yes", "on")
+
+def get_lazy_max_months() -> int:
+    return _read_config().getint("storage", "lazy_max_months", fallback=12)
+
+# tui only: save changes in the background a couple of seconds after editing stops
+def autosave_enabled() -> bool:
+    value = os.getenv("CALICULA_AUTOSAVE")
+    if value is None:
+        return _read_config().getboolean("autosave", "enabled", fallback=False)
+    return value.lower() in ("1", "true", "yes", "on")
+
+def get_autosave_delay() -> float:
+    value = os.getenv("CALICULA_AUTOSAVE_DELAY")
+    if value is None:
+        return _read_config().getfloat("autosave", "delay", fallback=DEFAULT_AUTOSAVE_DELAY)
+    return float(value)
@@ -0,0 +1,78 @@
+# storage/async_storage.py
+
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+from profiling import timings
+from subcalendar import Subcalendar
+from .backend_base import StorageBackend
+
+class AsyncStorage:
+    """Runs storage calls on a background thread so the TUI never blocks on slow backends.
+
+    Calls return futures and run one at a time in the order they were made, so a rename can't overtake
+    an earlier write. Writes take a copy of the subcalendar up front, so it can keep being edited.
+    Completion callbacks get the finished future. They are queued rather than run on the storage
+    thread, since curses and the subcalendars aren't thread safe, and run_callbacks runs them on the
+    calling thread.
+    """
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="calicula-storage")
+        self.completed = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self._pending = 0
+
+    # operations submitted but not finished yet
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    # name is what the call is recorded as in profiling's timings
+    def submit(self, name: str, fn: Callable, *args, callback: Optional[Callable[[Future], None]] = None) -> Future:
+        with self.lock:
+            self._pending += 1
+        future = self.executor.submit(self._run, name, fn, *args)
+        future.add_done_callback(lambda f: self._done(f, callback))
+        return future
+
+    def _run(self, name: str, fn: Callable, *args):
+        with timings.time(name):
+            return fn(*args)
+
+    def _done(self, future: Future, callback):
+        with self.lock:
+            self._pending -= 1
+        self.completed.put((future, callback))
+
+    def read_all(self, callback=None) -> Future:
+        return self.submit("storage.read_all", self.backend.read_all, callback=callback)
+
+    def write(self, subcalendar: Subcalendar, callback=None) -> Future:
+        return self.submit("storage.write", self.backend.prepare_write(subcalendar), callback=callback)
+
+    # one operation for the whole batch, so backends with a batched commit (write_many) can use it
+    def write_many(self, subcalendars, callback=None) -> Future:
+        return self.submit("storage.write_many", self.backend.prepare_write_many(subcalendars), callback=callback)
+
+    def rename(self, old_name: str, new_name: str, callback=None) -> Future:
+        return self.submit("storage.rename", self.backend.rename, old_name, new_name, callback=callback)
+
+    def run_callbacks(self) -> int:
+        """Run the callbacks of finished operations. Returns how many operations finished since the last call."""
+        finished = 0
+        while True:
+            try:
+                future, callback = self.completed.get_nowait()
+            except queue.Empty:
+                return finished
+            finished += 1
+            if callback is not None:
+                callback(future)
+
+    def close(self):
+        """Wait for everything submitted to finish and run the remaining callbacks."""
+        self.executor.shutdown(wait=True)
+        self.run_callbacks()
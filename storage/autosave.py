@@ -0,0 +1,150 @@
+# storage/autosave.py
+
+import threading
+import time
+from typing import List
+from profiling import timings
+from subcalendar import Subcalendar
+from .backend_base import StorageBackend
+
+DEFAULT_AUTOSAVE_DELAY = 2.0  # seconds without changes before a save starts
+MAX_RETRY_DELAY = 60.0  # failed saves are retried after delay, 2 * delay, ... up to this many seconds
+CLOSE_RETRY_DELAYS = (0.5, 1.0, 2.0)  # seconds before each retry of a final save that failed
+
+class Autosaver:
+    """Saves the TUI's changes from a background thread so keystrokes never wait on storage.
+
+    The thread that edits the subcalendars holds `lock` except while it waits for input, and calls
+    notify after handling each key. Changes are coalesced until `delay` seconds pass without another
+    one (or 4 * delay after the first), then the dirty subcalendars are copied under the lock and
+    written without it. Renames are queued and run in order before the next writes. A failed save is
+    retried with backoff, keeping any renames it didn't get to. close drains whatever is still pending.
+    """
+
+    def __init__(self, storage: StorageBackend, subcalendars: List[Subcalendar], delay: float = DEFAULT_AUTOSAVE_DELAY):
+        self.storage = storage
+        self.subcalendars = subcalendars
+        self.delay = delay
+        self.lock = threading.RLock()  # guards the subcalendars
+        self.condition = threading.Condition()  # guards the scheduling state below
+        self.deadline = None
+        self.first_change = None
+        self.renames = []
+        self.closing = False
+        self.seen = self._signature()
+        self.state = "saved"  # saved, pending, saving or error
+        self.error = None
+        self.saves = 0
+        self.failures = 0  # failed saves in a row
+        self.thread = threading.Thread(target=self._run, name="calicula-autosave", daemon=True)
+        self.thread.start()
+
+    # what has to change for a new save to be scheduled. cheap, it doesn't look at assignments
+    def _signature(self):
+        return tuple((sc.name, sc.version, sc.hidden, sc.color) for sc in self.subcalendars if sc.dirty)
+
+    def notify(self):
+        """Call with the lock held after handling input. Schedules a save if anything changed since the last call."""
+        signature = self._signature()
+        if signature == self.seen:
+            return
+        self.seen = signature
+        if signature:
+            self._schedule(self.delay)
+
+    def _schedule(self, delay: float):
+        with self.condition:
+            now = time.monotonic()
+            if self.first_change is None:
+                self.first_change = now
+            self.deadline = min(now + delay, self.first_change + 4 * self.delay)
+            if self.state != "saving":
+                self.state = "pending"
+            self.condition.notify()
+
+    def save_now(self):
+        """Start a save without waiting out the delay, e.g. for :w."""
+        self._schedule(0)
+
+    def rename(self, old_name: str, new_name: str):
+        with self.condition:
+            self.renames.append((old_name, new_name))
+        self._schedule(0)
+
+    @property
+    def status(self) -> str:
+        return "autosave failed" if self.state == "error" else self.state
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.closing and (self.deadline is None or self.deadline > time.monotonic()):
+                    self.condition.wait(None if self.deadline is None else self.deadline - time.monotonic())
+                closing = self.closing
+                self.deadline = None
+                self.first_change = None
+                self.state = "saving"
+            self._save()
+            if closing:
+                return
+
+    def _save(self):
+        with self.condition:
+            renames, self.renames = self.renames, []
+
+        # copy under the lock, write without it
+        with self.lock:
+            dirty = [sc for sc in self.subcalendars if sc.dirty]
+            states = [(sc.version, sc.name, sc.hidden, sc.color) for sc in dirty]
+            write = self.storage.prepare_write_many(dirty)
+
+        try:
+            while renames:
+                old_name, new_name = renames[0]
+                with timings.time("storage.rename"):
+                    self.storage.rename(old_name, new_name)
+                renames.pop(0)
+            with timings.time("autosave.write"):
+                write()
+        except Exception as e:
+            # renames not done yet go back in front of any queued since, the writes are redone from the
+            # subcalendars, which are still dirty
+            with self.condition:
+                self.renames[:0] = renames
+                self.state = "error"
+                self.error = str(e)
+                self.failures += 1
+                retry = time.monotonic() + min(self.delay * 2 ** (self.failures - 1), MAX_RETRY_DELAY)
+                self.deadline = retry if self.deadline is None else min(self.deadline, retry)
+            return
+
+        # anything edited while the copy was being written stays dirty for the next save
+        with self.lock:
+            for sc, state in zip(dirty, states):
+                if (sc.version, sc.name, sc.hidden, sc.color) == state:
+                    sc.mark_clean()
+            clean = not any(sc.dirty for sc in self.subcalendars)
+        with self.condition:
+            self.saves += 1
+            self.failures = 0
+            self.error = None
+            if self.deadline is None:
+                self.state = "saved" if clean else "pending"
+
+    def close(self):
+        """Save anything pending and stop the thread. Call without holding the lock.
+
+        A final save that fails is retried a few times here. Renames that still failed are left in
+        `renames` for the caller, which must run them before writing the renamed subcalendars.
+        """
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.thread.join()
+        for delay in CLOSE_RETRY_DELAYS:
+            if self.state != "error":
+                return
+            time.sleep(delay)
+            with self.condition:
+                self.deadline = None  # the thread's retry, which won't run now
+            self._save()
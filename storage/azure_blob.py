@@ -2,46 +2,116 @@
 
 import configparser
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 from azure.storage.blob import BlobServiceClient
 from subcalendar import Subcalendar
 from .backend_base import StorageBackend
+from .blob_cache import BlobCache, DEFAULT_CACHE_DIR
+
+DEFAULT_READ_CONCURRENCY = 8
+COPY_POLL_INITIAL = 0.05  # seconds between copy status checks on rename, doubling up to COPY_POLL_MAX
+COPY_POLL_MAX = 2.0
+COPY_TIMEOUT = 300
 
 class AzureBlobStorageBackend(StorageBackend):
-    def __init__(self):
+    # container_client can be passed in directly (e.g. an azurite container or a fake for tests),
+    # otherwise it is built from the connection string
+    def __init__(self, container_client=None, read_concurrency: int = None, cache_dir: str = None):
         # try azure app service env variables
         self.connection_string = os.getenv("AZURE_CONNECTION_STRING")
         self.container_name = os.getenv("AZURE_CONTAINER")
+        if read_concurrency is None and os.getenv("AZURE_READ_CONCURRENCY"):
+            read_concurrency = int(os.getenv("AZURE_READ_CONCURRENCY"))
+        if cache_dir is None:
+            cache_dir = os.getenv("AZURE_CACHE_DIR")
 
         # fallback to config file for local development
-        if not self.connection_string or not self.container_name:
-            config_path = os.path.expanduser("~/.config/calicula/config")
-            config = configparser.ConfigParser()
-            config.read(config_path)
+        config_path = os.path.expanduser("~/.config/calicula/config")
+        config = configparser.ConfigParser()
+        config.read(config_path)
 
+        if container_client is None:
             if not self.connection_string:
                 self.connection_string = config.get("azure", "connection_string")
 
             if not self.container_name:
                 self.container_name = config.get("azure", "container")
 
-        service_client = BlobServiceClient.from_connection_string(self.connection_string)
-        self.container_client = service_client.get_container_client(self.container_name)
+        if read_concurrency is None:
+            read_concurrency = config.getint("azure", "read_concurrency", fallback=DEFAULT_READ_CONCURRENCY)
+        self.read_concurrency = max(1, read_concurrency)
+
+        # local read-through cache, "none" turns it off
+        if cache_dir is None:
+            cache_dir = config.get("azure", "cache_dir", fallback=None)
+        if cache_dir is None and self.container_name:
+            cache_dir = os.path.join(DEFAULT_CACHE_DIR, self.container_name)
+        if cache_dir and cache_dir.lower() != "none":
+            self.cache = BlobCache(os.path.expanduser(cache_dir))
+        else:
+            self.cache = None
+
+        if container_client is None:
+            service_client = BlobServiceClient.from_connection_string(self.connection_string)
+            container_client = service_client.get_container_client(self.container_name)
+        self.container_client = container_client
 
     def read_all(self) -> List[Subcalendar]:
-        subcalendars = []
-        blobs = self.container_client.list_blobs()
-        for blob in blobs:
-            blob_client = self.container_client.get_blob_client(blob.name)
-            data = blob_client.download_blob().readall().decode("utf-8")
-            subcalendar = Subcalendar.from_blob(blob.name, data)
-            subcalendars.append(subcalendar)
-        return subcalendars
+        return list(self.iter_all())
+
+    # subcalendars are yielded in listing order as soon as each one is available, while the
+    # downloads of later ones continue in the background
+    def iter_all(self):
+        # the listing carries each blob's etag, so blobs unchanged since they were cached
+        # are read locally and a fully fresh cache costs a single listing call
+        listing = [(blob.name, blob.etag) for blob in self.container_client.list_blobs()]
+        cached = {}
+        if self.cache is not None:
+            for name, etag in listing:
+                data = self.cache.get(name, etag)
+                if data is not None:
+                    cached[name] = data
+        stale = [name for name, _ in listing if name not in cached]
+
+        pool = None
+        if self.read_concurrency > 1 and len(stale) > 1:
+            # downloads are network bound, so threads overlap the round trips
+            pool = ThreadPoolExecutor(max_workers=min(self.read_concurrency, len(stale)))
+            futures = {name: pool.submit(self._download, name) for name in stale}
+        try:
+            for name, _ in listing:
+                if name in cached:
+                    data = cached[name]
+                else:
+                    data, etag, last_modified = futures[name].result() if pool is not None else self._download(name)
+                    if self.cache is not None:
+                        self.cache.put(name, etag, data, last_modified)
+                yield Subcalendar.from_blob(name, data)
+            if self.cache is not None:
+                self.cache.retain(name for name, _ in listing)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True, cancel_futures=True)
+            if self.cache is not None:
+                self.cache.save()
+
+    # returns the blob contents with the etag they were downloaded at
+    def _download(self, name: str):
+        blob_client = self.container_client.get_blob_client(name)
+        downloader = blob_client.download_blob()
+        data = downloader.readall().decode("utf-8")
+        properties = downloader.properties
+        return data, properties.etag, _isoformat(properties.last_modified)
 
     def write(self, subcalendar: Subcalendar):
         data = subcalendar.to_blob()
         blob_client = self.container_client.get_blob_client(subcalendar.name)
-        blob_client.upload_blob(data, overwrite=True)
+        result = blob_client.upload_blob(data, overwrite=True)
+        if self.cache is not None:
+            self.cache.put(subcalendar.name, result["etag"], data, _isoformat(result.get("last_modified")))
+            self.cache.save()
 
     def rename(self, old_name: str, new_name: str):
         old_blob = self.container_client.get_blob_client(old_name)
@@ -50,15 +120,32 @@ class AzureBlobStorageBackend(StorageBackend):
         # Start blob copy
         copy = new_blob.start_copy_from_url(old_blob.url)
 
-        # Optionally wait for copy to finish
+        # wait for the copy to finish, polling with exponential backoff instead of hammering the service
+        delay = COPY_POLL_INITIAL
+        deadline = time.monotonic() + COPY_TIMEOUT
         props = new_blob.get_blob_properties()
         while props.copy.status == "pending":
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"copy of {old_name} to {new_name} still pending after {COPY_TIMEOUT}s")
+            time.sleep(delay)
+            delay = min(delay * 2, COPY_POLL_MAX)
             props = new_blob.get_blob_properties()
+        if props.copy.status != "success":
+            raise RuntimeError(f"copy of {old_name} to {new_name} {props.copy.status}")
 
         # Delete old blob
         old_blob.delete_blob()
 
+        # the copy has a new etag, let the next read_all fetch it
+        if self.cache is not None:
+            self.cache.discard(old_name)
+            self.cache.discard(new_name)
+            self.cache.save()
+
 
     @property
     def name(self):
         return "azure"
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
@@ -1,14 +1,23 @@
 # storage/backend_base.py
 
 from abc import ABC, abstractmethod
-from subcalendar import Subcalendar
-from typing import List
+from datetime import date
+from subcalendar import Assignment, Subcalendar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 class StorageBackend(ABC):
+    # true for backends that answer list_subcalendars/query_assignments without loading everything
+    indexed_queries = False
+
     @abstractmethod
     def read_all(self) -> List[Subcalendar]:
         pass
 
+    def iter_all(self) -> Iterator[Subcalendar]:
+        """Like read_all but yields each subcalendar as soon as it is read, so callers can start on the first
+        before the last is loaded. Backends that can read one subcalendar at a time override this."""
+        yield from self.read_all()
+
     @abstractmethod
     def write(self, subcalendar: Subcalendar):
         pass
@@ -18,3 +27,75 @@ class StorageBackend(ABC):
         """Rename a subcalendar from old_name to new_name in storage."""
         pass
 
+    def write_changes(self, subcalendar: Subcalendar, changes: List[dict]):
+        """Persist a subcalendar after the given assignment changes were applied to it.
+
+        Backends that can store changes incrementally override this, the default rewrites the whole subcalendar.
+        """
+        self.write(subcalendar)
+
+    def write_ranges(self, subcalendar: Subcalendar, ranges: List[Tuple[date, date]]):
+        """Write a partially loaded subcalendar: its assignments due inside the given (start, end) ranges
+        replace the stored ones in those ranges, and stored assignments outside them are kept."""
+        def inside(a):
+            return any(start <= a.date <= end for start, end in ranges)
+
+        stored = next((sc for sc in self.read_all() if sc.name == subcalendar.name), None)
+        merged = Subcalendar(subcalendar.name, subcalendar.color)
+        merged.hidden = subcalendar.hidden
+        kept = [a for a in stored.assignments if not inside(a)] if stored is not None else []
+        merged.assignments = kept + [a for a in subcalendar.assignments if inside(a)]
+        self.write(merged)
+
+    def prepare_write(self, subcalendar: Subcalendar) -> Callable[[], None]:
+        """Capture a subcalendar as it is now and return a function that writes that copy.
+
+        Called on the thread that edits the subcalendars, the returned function can then run on another one.
+        """
+        copy = subcalendar.copy()
+        return lambda: self.write(copy)
+
+    def prepare_write_many(self, subcalendars: List[Subcalendar]) -> Callable[[], None]:
+        """prepare_write for a batch of subcalendars, returns one function that writes them all."""
+        writes = [self.prepare_write(sc) for sc in subcalendars]
+        def write_all():
+            for write in writes:
+                write()
+        return write_all
+
+    def write_many(self, subcalendars: List[Subcalendar]):
+        """Write several subcalendars. Backends that can commit a batch more cheaply than one write at a time override this."""
+        for subcalendar in subcalendars:
+            self.write(subcalendar)
+
+    def write_dirty(self, subcalendars: List[Subcalendar]) -> int:
+        """Write only the subcalendars changed since they were last written. Returns how many were written."""
+        dirty = [sc for sc in subcalendars if sc.dirty]
+        self.write_many(dirty)
+        for subcalendar in dirty:
+            subcalendar.mark_clean()
+        return len(dirty)
+
+    def list_subcalendars(self) -> List[Subcalendar]:
+        """Subcalendar names, colors and visibility, without their assignments."""
+        subcalendars = []
+        for sc in self.read_all():
+            meta = Subcalendar(sc.name, sc.color)
+            meta.hidden = sc.hidden
+            meta.mark_clean()
+            subcalendars.append(meta)
+        return subcalendars
+
+    def query_assignments(self, start: date, end: date, names: Optional[Iterable[str]] = None,
+                          completed: Optional[bool] = None) -> Dict[str, List[Assignment]]:
+        """Assignments due between start and end (inclusive) in date order, keyed by subcalendar name."""
+        names = set(names) if names is not None else None
+        result = {}
+        for sc in self.read_all():
+            if names is not None and sc.name not in names:
+                continue
+            assignments = sc.assignments_between(start, end)
+            if completed is not None:
+                assignments = [a for a in assignments if bool(a.completed) == completed]
+            result[sc.name] = assignments
+        return result
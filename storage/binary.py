@@ -0,0 +1,107 @@
+# storage/binary.py
+
+import configparser
+import os
+import threading
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import binary_snapshot
+from binary_snapshot import BinarySnapshot, EXTENSION
+from subcalendar import Assignment, Subcalendar
+from .backend_base import StorageBackend
+
+BINARY_DIR = os.path.expanduser("~/.local/share/calicula/binary")
+
+class BinaryStorageBackend(StorageBackend):
+    """One memory mapped binary snapshot per subcalendar (see binary_snapshot.py).
+
+    Listing subcalendars reads only the file headers, and date range queries decode only the records
+    in range, so together with lazy loading startup cost doesn't grow with the archive.
+    """
+    indexed_queries = True
+
+    def __init__(self, directory: str = None):
+        if directory is None:
+            config_path = os.path.expanduser("~/.config/calicula/config")
+            config = configparser.ConfigParser()
+            config.read(config_path)
+            directory = os.path.expanduser(config.get("binary", "directory", fallback=BINARY_DIR))
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        # name -> open BinarySnapshot. a write only forgets the old one instead of closing it, since another
+        # thread may still be decoding from it; its map is closed when the last reader drops it
+        self.snapshots = {}
+        self.lock = threading.Lock()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name + EXTENSION)
+
+    def _names(self) -> List[str]:
+        return sorted(f[:-len(EXTENSION)] for f in os.listdir(self.directory) if f.endswith(EXTENSION))
+
+    def _open(self, name: str) -> BinarySnapshot:
+        with self.lock:
+            snapshot = self.snapshots.get(name)
+            if snapshot is None:
+                snapshot = self.snapshots[name] = BinarySnapshot(self._path(name), name)
+            return snapshot
+
+    def _forget(self, name: str):
+        with self.lock:
+            self.snapshots.pop(name, None)
+
+    def read_all(self) -> List[Subcalendar]:
+        return list(self.iter_all())
+
+    def iter_all(self):
+        for name in self._names():
+            yield self._open(name).to_subcalendar()
+
+    def list_subcalendars(self) -> List[Subcalendar]:
+        return [self._open(name).metadata() for name in self._names()]
+
+    def query_assignments(self, start: date, end: date, names: Optional[Iterable[str]] = None,
+                          completed: Optional[bool] = None) -> Dict[str, List[Assignment]]:
+        names = self._names() if names is None else [name for name in names if os.path.exists(self._path(name))]
+        result = {}
+        for name in names:
+            assignments = self._open(name).assignments_between(start, end)
+            if completed is not None:
+                assignments = [a for a in assignments if bool(a.completed) == completed]
+            result[name] = assignments
+        return result
+
+    def write(self, subcalendar: Subcalendar):
+        binary_snapshot.write(subcalendar, self._path(subcalendar.name))
+        self._forget(subcalendar.name)
+
+    # merges with this subcalendar's snapshot alone, decoding only the records between the ranges
+    def write_ranges(self, subcalendar: Subcalendar, ranges: List[Tuple[date, date]]):
+        kept = []
+        if os.path.exists(self._path(subcalendar.name)):
+            snapshot = self._open(subcalendar.name)
+            start = date.min
+            for lo, hi in sorted(ranges):
+                if lo > start:
+                    kept.extend(snapshot.assignments_between(start, lo - timedelta(days=1)))
+                if hi >= start:
+                    if hi == date.max:
+                        start = None
+                        break
+                    start = hi + timedelta(days=1)
+            if start is not None:
+                kept.extend(snapshot.assignments_between(start, date.max))
+        merged = Subcalendar(subcalendar.name, subcalendar.color)
+        merged.hidden = subcalendar.hidden
+        merged.assignments = kept + [a for a in subcalendar.assignments if any(start <= a.date <= end for start, end in ranges)]
+        self.write(merged)
+
+    def rename(self, old_name: str, new_name: str):
+        if os.path.exists(self._path(old_name)):
+            os.replace(self._path(old_name), self._path(new_name))
+        self._forget(old_name)
+        self._forget(new_name)
+
+    @property
+    def name(self):
+        return "binary"
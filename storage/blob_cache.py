@@ -0,0 +1,107 @@
+# storage/blob_cache.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Optional
+from utils import file_lock
+
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.cache/calicula/azure")
+
+class BlobCache:
+    """Local copy of blob contents keyed by blob name, each tagged with the etag it was downloaded at.
+
+    Safe to share between threads, and between processes using the same directory: files are written
+    under unique temporary names and renamed into place, and each blob's contents are stored per etag
+    so an index entry never points at another version's file. save merges this process's changes into
+    the index on disk under a file lock, so entries other processes added are kept.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.index_path = os.path.join(self.directory, "index.json")
+        self.lock = threading.Lock()
+        self.index = self._load()
+        self.changes = {}  # name -> entry put, or None if discarded, since the last save
+
+    def _load(self) -> dict:
+        try:
+            with open(self.index_path, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _path(self, name: str, etag: str) -> str:
+        # blob names are subcalendar names, hash them so any name is a safe filename
+        return os.path.join(self.directory, hashlib.sha1(f"{name}\0{etag}".encode("utf-8")).hexdigest())
+
+    def _write(self, path: str, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _remove(self, name: str, entry: dict):
+        try:
+            os.remove(self._path(name, entry.get("etag")))
+        except OSError:
+            pass
+
+    def get(self, name: str, etag: str) -> Optional[str]:
+        """Return the cached contents if they were stored at this etag, otherwise None."""
+        with self.lock:
+            entry = self.index.get(name)
+        if entry is None or entry.get("etag") != etag:
+            return None
+        try:
+            with open(self._path(name, etag), "r", encoding="utf-8") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def put(self, name: str, etag: str, data: str, last_modified: Optional[str] = None):
+        self._write(self._path(name, etag), data.encode("utf-8"))
+        entry = {"etag": etag, "last_modified": last_modified}
+        with self.lock:
+            old = self.index.get(name)
+            self.index[name] = self.changes[name] = entry
+        if old is not None and old.get("etag") != etag:
+            self._remove(name, old)
+
+    def discard(self, name: str):
+        with self.lock:
+            entry = self.index.pop(name, None)
+            self.changes[name] = None
+        if entry is not None:
+            self._remove(name, entry)
+
+    def retain(self, names):
+        """Drop entries for blobs that are no longer in the container."""
+        with self.lock:
+            gone = set(self.index) - set(names)
+        for name in gone:
+            self.discard(name)
+
+    def save(self):
+        # the lock is held while writing too, so an older snapshot of the index can't replace a newer one
+        with self.lock, file_lock(self.index_path + ".lock"):
+            index = self._load()
+            for name, entry in self.changes.items():
+                old = index.pop(name, None)
+                if old is not None and (entry is None or old.get("etag") != entry["etag"]):
+                    self._remove(name, old)  # a version only another process had stored
+                if entry is not None:
+                    index[name] = entry
+            self._write(self.index_path, json.dumps(index).encode("utf-8"))
+            self.index = index
+            self.changes = {}
@@ -0,0 +1,286 @@
+# storage/journal.py
+
+import configparser
+import json
+import os
+import threading
+from collections import Counter
+from typing import List
+from subcalendar import Assignment, Subcalendar
+from utils import fsync_dir, write_atomic, write_temp
+from .backend_base import StorageBackend
+
+JOURNAL_DIR = os.path.expanduser("~/.local/share/calicula/journal")
+DEFAULT_COMPACT_THRESHOLD = 1000
+
+# each subcalendar is stored as up to three files:
+# <name>.snapshot - json {"seq": n, "color": c, "rows": [...]} holding the state up to record n
+# <name>.log      - json lines of mutation records appended since then
+# <name>.log.old  - records set aside for a compaction that is still running (or was interrupted)
+# <name>.rename   - json {"to": new name} while the files above are being moved to a new name
+#
+# a row is [name, YYYYMMDD, completed, studytime]. records are numbered, and replay skips any record
+# at or below the seq it has already applied, so a crash at any point during compaction leaves a
+# state that replays to the same result. a rename moved only partway when the process died is finished
+# the next time the journal is opened.
+
+class _JournalState:
+    def __init__(self):
+        self.color = None
+        self.rows = Counter()
+        self.seq = 0
+        self.pending = 0  # records written since the last snapshot
+
+    def apply(self, record: dict):
+        op = record["op"]
+        if op == "color":
+            self.color = record["color"]
+            return
+        row = tuple(record["row"])
+        if op == "insert":
+            self.rows[row] += 1
+        elif op == "delete":
+            self._discard(row)
+        elif op == "toggle":  # row is the assignment before it was toggled
+            if self._discard(row):
+                self.rows[(row[0], row[1], 1 - row[2], row[3])] += 1
+
+    def _discard(self, row: tuple) -> bool:
+        count = self.rows.get(row, 0)
+        if count > 1:
+            self.rows[row] = count - 1
+        elif count == 1:
+            del self.rows[row]
+        return count > 0
+
+def _row(a: Assignment) -> tuple:
+    return (a.name, a.date_str, int(bool(a.completed)), a.studytime)
+
+class JournalStorageBackend(StorageBackend):
+    """Appends the changes made since the last write instead of rewriting the subcalendar,
+    and folds the log into a snapshot on a background thread once it grows past a threshold."""
+
+    def __init__(self, directory: str = None, compact_threshold: int = None):
+        config_path = os.path.expanduser("~/.config/calicula/config")
+        config = configparser.ConfigParser()
+        config.read(config_path)
+
+        if directory is None:
+            directory = os.path.expanduser(config.get("journal", "directory", fallback=JOURNAL_DIR))
+        if compact_threshold is None:
+            compact_threshold = config.getint("journal", "compact_threshold", fallback=DEFAULT_COMPACT_THRESHOLD)
+
+        self.directory = directory
+        self.compact_threshold = compact_threshold
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.states = {}  # name -> _JournalState as last written or read
+        self.compactions = {}  # name -> running compaction thread
+        self._finish_renames()
+
+    def _path(self, name: str, suffix: str) -> str:
+        return os.path.join(self.directory, name + suffix)
+
+    def _names(self) -> List[str]:
+        names = set()
+        for filename in os.listdir(self.directory):
+            for suffix in (".snapshot", ".log", ".log.old"):
+                if filename.endswith(suffix):
+                    names.add(filename[:-len(suffix)])
+                    break
+        return sorted(names)
+
+    # rebuild a subcalendar's state from its snapshot and logs
+    def _replay(self, name: str) -> _JournalState:
+        state = _JournalState()
+        try:
+            with open(self._path(name, ".snapshot"), "r", encoding="utf-8") as file:
+                snapshot = json.load(file)
+            state.color = snapshot["color"]
+            state.rows = Counter(tuple(row) for row in snapshot["rows"])
+            state.seq = snapshot["seq"]
+        except FileNotFoundError:
+            pass
+
+        for suffix in (".log.old", ".log"):
+            path = self._path(name, suffix)
+            try:
+                file = open(path, "rb")
+            except FileNotFoundError:
+                continue
+            with file:
+                good = 0
+                for line in file:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete record")
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    good += len(line)
+                    if record["seq"] <= state.seq:
+                        continue
+                    state.apply(record)
+                    state.seq = record["seq"]
+                    state.pending += 1
+                torn = good < os.fstat(file.fileno()).st_size
+            if torn:
+                # cut off a record left half written by an interrupted append, so new records start on a clean line
+                os.truncate(path, good)
+        return state
+
+    def _state(self, name: str) -> _JournalState:
+        state = self.states.get(name)
+        if state is None:
+            state = self._replay(name)
+            self.states[name] = state
+        return state
+
+    def read_all(self) -> List[Subcalendar]:
+        return list(self.iter_all())
+
+    # the lock is taken per subcalendar so a slow consumer doesn't hold up writes
+    def iter_all(self):
+        with self.lock:
+            names = self._names()
+        for name in names:
+            with self.lock:
+                state = self._replay(name)
+                self.states[name] = state
+                subcalendar = Subcalendar(name, state.color if state.color is not None else 1)
+                subcalendar.assignments = [Assignment(n, d, c, s) for n, d, c, s in state.rows.elements()]
+            subcalendar.mark_clean()
+            yield subcalendar
+
+    # diff the subcalendar against what was last stored and append only the difference
+    def write(self, subcalendar: Subcalendar):
+        with self.lock:
+            state = self._state(subcalendar.name)
+            current = Counter(_row(a) for a in subcalendar.assignments)
+            removed = state.rows - current
+            added = current - state.rows
+
+            records = []
+            if state.color != subcalendar.color:
+                records.append({"op": "color", "color": subcalendar.color})
+            for row in list(removed.elements()):
+                flipped = (row[0], row[1], 1 - row[2], row[3])
+                if added[flipped] > 0:
+                    added[flipped] -= 1
+                    removed[row] -= 1
+                    records.append({"op": "toggle", "row": list(row)})
+            for row in removed.elements():
+                records.append({"op": "delete", "row": list(row)})
+            for row in added.elements():
+                records.append({"op": "insert", "row": list(row)})
+            if not records:
+                return
+
+            lines = []
+            for record in records:
+                state.seq += 1
+                record["seq"] = state.seq
+                lines.append(json.dumps(record, separators=(",", ":")) + "\n")
+            with open(self._path(subcalendar.name, ".log"), "a", encoding="utf-8") as file:
+                file.write("".join(lines))
+                file.flush()
+                os.fsync(file.fileno())
+
+            for record in records:
+                state.apply(record)
+            state.pending += len(records)
+            if state.pending >= self.compact_threshold:
+                self._start_compaction(subcalendar.name, state)
+
+    # called with the lock held. the live log is set aside so appends can continue while the snapshot is written
+    def _start_compaction(self, name: str, state: _JournalState):
+        if name in self.compactions:
+            return
+        log_path = self._path(name, ".log")
+        old_path = self._path(name, ".log.old")
+        if not os.path.exists(log_path):
+            return
+        if os.path.exists(old_path):
+            # an earlier compaction never finished, keep its records with the ones set aside now
+            with open(log_path, "r", encoding="utf-8") as src, open(old_path, "a", encoding="utf-8") as dst:
+                dst.write(src.read())
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.remove(log_path)
+        else:
+            os.replace(log_path, old_path)
+
+        snapshot = {"seq": state.seq, "color": state.color, "rows": [list(row) for row in sorted(state.rows.elements())]}
+        state.pending = 0
+        thread = threading.Thread(target=self._compact, args=(name, snapshot))
+        self.compactions[name] = thread
+        thread.start()
+
+    # the snapshot is written without the lock, but swapped in and the set aside log removed under it,
+    # so a replay never sees the old snapshot and then finds the records after it gone
+    def _compact(self, name: str, snapshot: dict):
+        try:
+            snapshot_path = self._path(name, ".snapshot")
+            tmp_path = write_temp(snapshot_path, json.dumps(snapshot, separators=(",", ":")).encode("utf-8"))
+            with self.lock:
+                os.replace(tmp_path, snapshot_path)
+                fsync_dir(self.directory)
+                os.remove(self._path(name, ".log.old"))
+        finally:
+            with self.lock:
+                self.compactions.pop(name, None)
+
+    def wait_for_compaction(self):
+        """Block until any running compactions have finished."""
+        while True:
+            with self.lock:
+                threads = list(self.compactions.values())
+            if not threads:
+                return
+            for thread in threads:
+                thread.join()
+
+    # the move is recorded in <old>.rename before any file is moved, so it can be finished after a crash
+    # instead of leaving the snapshot under one name and the log under the other
+    def rename(self, old_name: str, new_name: str):
+        while True:
+            with self.lock:
+                thread = self.compactions.get(old_name)
+                if thread is None:
+                    marker = self._path(old_name, ".rename")
+                    write_atomic(marker, json.dumps({"to": new_name}).encode("utf-8"))
+                    self._move(old_name, new_name)
+                    os.remove(marker)
+                    fsync_dir(self.directory)
+                    if old_name in self.states:
+                        self.states[new_name] = self.states.pop(old_name)
+                    return
+            thread.join()
+
+    def _move(self, old_name: str, new_name: str):
+        for suffix in (".snapshot", ".log", ".log.old"):
+            old_path = self._path(old_name, suffix)
+            if os.path.exists(old_path):
+                os.replace(old_path, self._path(new_name, suffix))
+        fsync_dir(self.directory)
+
+    def _finish_renames(self):
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".rename"):
+                continue
+            old_name = filename[:-len(".rename")]
+            marker = self._path(old_name, ".rename")
+            try:
+                with open(marker, "r", encoding="utf-8") as file:
+                    new_name = json.load(file)["to"]
+            except (OSError, ValueError, KeyError):
+                os.remove(marker)  # written atomically, so only garbage if made by something else
+                continue
+            self._move(old_name, new_name)
+            os.remove(marker)
+        fsync_dir(self.directory)
+
+    @property
+    def name(self):
+        return "journal"
@@ -3,6 +3,7 @@
 import os
 from typing import List
 from subcalendar import Subcalendar
+from utils import fsync_dir, write_temp
 from .backend_base import StorageBackend
 
 SUBCAL_DIR = os.path.expanduser("~/.local/share/subcalendars")
@@ -12,19 +13,46 @@ if not os.path.exists(SUBCAL_DIR):
 
 
 class LocalStorageBackend(StorageBackend):
+    def __init__(self, directory: str = None):
+        self.directory = directory if directory is not None else SUBCAL_DIR
+
     def read_all(self) -> List[Subcalendar]:
-        return Subcalendar.read_all_local(SUBCAL_DIR)
+        return Subcalendar.read_all_local(self.directory)
+
+    def iter_all(self):
+        return Subcalendar.iter_local(self.directory)
 
     def write(self, subcalendar: Subcalendar):
-        subcalendar.write_local(SUBCAL_DIR)
+        subcalendar.write_local(self.directory)
+
+    # every file is written and synced under a temporary name first, then all are renamed into place
+    # and the directory is synced once. a failure before the renames leaves every subcalendar untouched
+    def write_many(self, subcalendars: List[Subcalendar]):
+        staged = []
+        try:
+            for subcalendar in subcalendars:
+                path = os.path.join(self.directory, subcalendar.name)
+                staged.append((write_temp(path, subcalendar.to_file_bytes()), path))
+        except Exception:
+            for tmp_path, _ in staged:
+                os.remove(tmp_path)
+            raise
+        for tmp_path, path in staged:
+            os.replace(tmp_path, path)
+        if staged:
+            fsync_dir(self.directory)
+
+    def prepare_write_many(self, subcalendars: List[Subcalendar]):
+        copies = [sc.copy() for sc in subcalendars]
+        return lambda: self.write_many(copies)
 
     @property
     def name(self):
         return "local"
 
     def rename(self, old_name: str, new_name: str):
-        old_path = os.path.join(SUBCAL_DIR, old_name)
-        new_path = os.path.join(SUBCAL_DIR, new_name)
+        old_path = os.path.join(self.directory, old_name)
+        new_path = os.path.join(self.directory, new_name)
         if os.path.exists(old_path):
             os.rename(old_path, new_path)
 
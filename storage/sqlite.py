@@ -0,0 +1,211 @@
+# storage/sqlite.py
+
+import configparser
+import os
+import sqlite3
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from subcalendar import Assignment, Subcalendar
+from .backend_base import StorageBackend
+
+SQLITE_PATH = os.path.expanduser("~/.local/share/calicula/calicula.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subcalendars (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    color INTEGER NOT NULL DEFAULT 1,
+    hidden INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS assignments (
+    id INTEGER PRIMARY KEY,
+    subcalendar_id INTEGER NOT NULL REFERENCES subcalendars(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    due INTEGER NOT NULL, -- YYYYMMDD, sorts the same as the date
+    completed INTEGER NOT NULL DEFAULT 0,
+    studytime INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS assignments_due ON assignments(due);
+CREATE INDEX IF NOT EXISTS assignments_subcalendar_due ON assignments(subcalendar_id, due);
+"""
+
+def _due(d: date) -> int:
+    return d.year * 10000 + d.month * 100 + d.day
+
+# the year, month and day of an assignment or match in an app change
+def _change_due(data: dict) -> int:
+    return int(data["year"]) * 10000 + int(data["month"]) * 100 + int(data["day"])
+
+class SQLiteStorageBackend(StorageBackend):
+    indexed_queries = True
+
+    def __init__(self, path: str = None):
+        if path is None:
+            path = os.getenv("CALICULA_SQLITE_PATH")
+        if path is None:
+            config_path = os.path.expanduser("~/.config/calicula/config")
+            config = configparser.ConfigParser()
+            config.read(config_path)
+            path = os.path.expanduser(config.get("sqlite", "path", fallback=SQLITE_PATH))
+
+        self.path = path
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # sqlite connections can't be shared between threads, so each thread (e.g. flask workers) gets its own
+        self.local = threading.local()
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self.local.conn = conn
+        return conn
+
+    def read_all(self) -> List[Subcalendar]:
+        conn = self._connect()
+        subcalendars = {}
+        for sid, name, color, hidden in conn.execute("SELECT id, name, color, hidden FROM subcalendars ORDER BY name"):
+            subcalendar = Subcalendar(name, color)
+            subcalendar.hidden = bool(hidden)
+            subcalendars[sid] = (subcalendar, [])
+        rows = conn.execute("SELECT subcalendar_id, name, due, completed, studytime FROM assignments ORDER BY due, id")
+        for sid, name, due, completed, studytime in rows:
+            subcalendars[sid][1].append(Assignment(name, str(due), completed, studytime))
+        result = []
+        for subcalendar, assignments in subcalendars.values():
+            subcalendar.assignments = assignments
+            subcalendar.mark_clean()
+            result.append(subcalendar)
+        return result
+
+    # one query per subcalendar on the (subcalendar_id, due) index, so rows aren't all held at once
+    def iter_all(self):
+        conn = self._connect()
+        for sid, name, color, hidden in conn.execute("SELECT id, name, color, hidden FROM subcalendars ORDER BY name").fetchall():
+            subcalendar = Subcalendar(name, color)
+            subcalendar.hidden = bool(hidden)
+            rows = conn.execute("SELECT name, due, completed, studytime FROM assignments WHERE subcalendar_id = ? ORDER BY due, id", (sid,))
+            subcalendar.assignments = [Assignment(n, str(due), completed, studytime) for n, due, completed, studytime in rows]
+            subcalendar.mark_clean()
+            yield subcalendar
+
+    # replaces the subcalendar's rows in a single transaction
+    def write(self, subcalendar: Subcalendar):
+        conn = self._connect()
+        with conn:
+            sid = self._upsert_subcalendar(conn, subcalendar)
+            conn.execute("DELETE FROM assignments WHERE subcalendar_id = ?", (sid,))
+            conn.executemany(
+                "INSERT INTO assignments (subcalendar_id, name, due, completed, studytime) VALUES (?, ?, ?, ?, ?)",
+                [(sid, a.name, _due(a.date), int(bool(a.completed)), a.studytime) for a in subcalendar.assignments],
+            )
+
+    # applies each change to the matching row instead of rewriting the subcalendar. a row is matched the
+    # way the app matches assignments, the first (lowest id) one with that name on that date. created and
+    # moved assignments get a new row so they sort after the others on their date, like they do in memory.
+    # if a change finds no row the stored copy has drifted from ours, so the whole subcalendar is rewritten
+    def write_changes(self, subcalendar: Subcalendar, changes: List[dict]):
+        conn = self._connect()
+        try:
+            with conn:
+                row = conn.execute("SELECT id FROM subcalendars WHERE name = ?", (subcalendar.name,)).fetchone()
+                if row is None:
+                    raise LookupError(subcalendar.name)
+                sid = row[0]
+                for change in changes:
+                    self._apply_change(conn, sid, change)
+        except LookupError:
+            self.write(subcalendar)
+
+    def _apply_change(self, conn: sqlite3.Connection, sid: int, change: dict):
+        op = change.get("op")
+        if op == "create":
+            data = change["assignment"]
+            conn.execute("INSERT INTO assignments (subcalendar_id, name, due, completed, studytime) VALUES (?, ?, ?, ?, ?)",
+                         (sid, data["name"], _change_due(data), int(bool(data.get("completed", False))), int(data.get("studytime", 0))))
+            return
+
+        match = change["match"]
+        row = conn.execute("SELECT id FROM assignments WHERE subcalendar_id = ? AND due = ? AND name = ? ORDER BY id LIMIT 1",
+                           (sid, _change_due(match), match.get("name"))).fetchone()
+        if row is None:
+            raise LookupError(match)
+        aid = row[0]
+        if op == "delete":
+            conn.execute("DELETE FROM assignments WHERE id = ?", (aid,))
+            return
+
+        if "completed" in change:
+            conn.execute("UPDATE assignments SET completed = ? WHERE id = ?", (int(bool(change["completed"])), aid))
+        if "name" in change:
+            conn.execute("UPDATE assignments SET name = ? WHERE id = ?", (change["name"], aid))
+        if "studytime" in change:
+            conn.execute("UPDATE assignments SET studytime = ? WHERE id = ?", (int(change["studytime"]), aid))
+        if "to" in change:
+            conn.execute("INSERT INTO assignments (subcalendar_id, name, due, completed, studytime) "
+                         "SELECT subcalendar_id, name, ?, completed, studytime FROM assignments WHERE id = ?",
+                         (_change_due(change["to"]), aid))
+            conn.execute("DELETE FROM assignments WHERE id = ?", (aid,))
+
+    def write_ranges(self, subcalendar: Subcalendar, ranges: List[Tuple[date, date]]):
+        conn = self._connect()
+        with conn:
+            sid = self._upsert_subcalendar(conn, subcalendar)
+            for start, end in ranges:
+                conn.execute("DELETE FROM assignments WHERE subcalendar_id = ? AND due BETWEEN ? AND ?",
+                             (sid, _due(start), _due(end)))
+                conn.executemany(
+                    "INSERT INTO assignments (subcalendar_id, name, due, completed, studytime) VALUES (?, ?, ?, ?, ?)",
+                    [(sid, a.name, _due(a.date), int(bool(a.completed)), a.studytime)
+                     for a in subcalendar.assignments_between(start, end)],
+                )
+
+    def _upsert_subcalendar(self, conn: sqlite3.Connection, subcalendar: Subcalendar) -> int:
+        conn.execute(
+            "INSERT INTO subcalendars (name, color, hidden) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET color = excluded.color, hidden = excluded.hidden",
+            (subcalendar.name, subcalendar.color, int(subcalendar.hidden)),
+        )
+        return conn.execute("SELECT id FROM subcalendars WHERE name = ?", (subcalendar.name,)).fetchone()[0]
+
+    def rename(self, old_name: str, new_name: str):
+        conn = self._connect()
+        with conn:
+            conn.execute("UPDATE subcalendars SET name = ? WHERE name = ?", (new_name, old_name))
+
+    def list_subcalendars(self) -> List[Subcalendar]:
+        subcalendars = []
+        for name, color, hidden in self._connect().execute("SELECT name, color, hidden FROM subcalendars ORDER BY name"):
+            subcalendar = Subcalendar(name, color)
+            subcalendar.hidden = bool(hidden)
+            subcalendar.mark_clean()
+            subcalendars.append(subcalendar)
+        return subcalendars
+
+    def query_assignments(self, start: date, end: date, names: Optional[Iterable[str]] = None,
+                          completed: Optional[bool] = None) -> Dict[str, List[Assignment]]:
+        sql = ("SELECT s.name, a.name, a.due, a.completed, a.studytime FROM assignments a "
+               "JOIN subcalendars s ON s.id = a.subcalendar_id WHERE a.due BETWEEN ? AND ?")
+        params = [_due(start), _due(end)]
+        if names is not None:
+            names = list(names)
+            sql += f" AND s.name IN ({', '.join('?' * len(names))})"
+            params.extend(names)
+        if completed is not None:
+            sql += " AND a.completed = ?"
+            params.append(int(completed))
+        sql += " ORDER BY a.due, a.id"
+
+        result = {}
+        for subcal, name, due, done, studytime in self._connect().execute(sql, params):
+            result.setdefault(subcal, []).append(Assignment(name, str(due), done, studytime))
+        return result
+
+    @property
+    def name(self):
+        return "sqlite"
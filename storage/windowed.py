@@ -0,0 +1,93 @@
+# storage/windowed.py
+
+from collections import OrderedDict
+from datetime import date
+from typing import List, Tuple
+from subcalendar import Subcalendar
+from utils import get_days_in_month
+from .backend_base import StorageBackend
+
+DEFAULT_WINDOW_RADIUS = 1  # months loaded on either side of the one on screen
+DEFAULT_MAX_MONTHS = 12
+
+def _shift(year: int, month: int, offset: int) -> Tuple[int, int]:
+    index = year * 12 + month + offset
+    return index // 12, index % 12
+
+def _month_range(year: int, month: int) -> Tuple[date, date]:
+    return date(year, month + 1, 1), date(year, month + 1, get_days_in_month(month, year))
+
+class WindowedStorage(StorageBackend):
+    """Wraps a backend for the TUI so only a window of months is held in memory.
+
+    read_all returns subcalendar metadata without assignments. load_window then fills in the months
+    around the one on screen and evicts the least recently used ones past max_months. Months are
+    (year, zero-based month) like the rest of the UI. Writes only replace the loaded months in storage.
+    """
+
+    def __init__(self, backend: StorageBackend, radius: int = DEFAULT_WINDOW_RADIUS, max_months: int = DEFAULT_MAX_MONTHS):
+        self.backend = backend
+        self.radius = radius
+        self.max_months = max(max_months, 2 * radius + 1)
+        self.loaded = OrderedDict()  # (year, month) -> None, least recently used first
+
+    @property
+    def indexed_queries(self):
+        return self.backend.indexed_queries
+
+    def read_all(self) -> List[Subcalendar]:
+        self.loaded.clear()
+        return self.backend.list_subcalendars()
+
+    # make sure the months around (year, month) are loaded. returns True if any month was loaded or evicted
+    def load_window(self, subcalendars: List[Subcalendar], year: int, month: int) -> bool:
+        changed = False
+        by_name = {sc.name: sc for sc in subcalendars}
+        for offset in sorted(range(-self.radius, self.radius + 1), key=abs, reverse=True):
+            key = _shift(year, month, offset)  # the month on screen is touched last, so it is evicted last
+            if key in self.loaded:
+                self.loaded.move_to_end(key)
+                continue
+            start, end = _month_range(*key)
+            for name, assignments in self.backend.query_assignments(start, end).items():
+                if name in by_name:
+                    by_name[name].load_assignments(assignments)
+            self.loaded[key] = None
+            changed = True
+
+        # unsaved edits would be lost by unloading, so eviction waits until everything is written
+        if not any(sc.dirty for sc in subcalendars):
+            while len(self.loaded) > self.max_months:
+                key, _ = self.loaded.popitem(last=False)
+                start, end = _month_range(*key)
+                for sc in subcalendars:
+                    sc.unload_between(start, end)
+                changed = True
+        return changed
+
+    # loaded months merged into contiguous date ranges
+    def loaded_ranges(self) -> List[Tuple[date, date]]:
+        ranges = []
+        for key in sorted(self.loaded):
+            start, end = _month_range(*key)
+            if ranges and (ranges[-1][1].toordinal() + 1) == start.toordinal():
+                ranges[-1] = (ranges[-1][0], end)
+            else:
+                ranges.append((start, end))
+        return ranges
+
+    def write(self, subcalendar: Subcalendar):
+        self.backend.write_ranges(subcalendar, self.loaded_ranges())
+
+    # the loaded months are captured along with the copy, so later loads and evictions don't change what gets replaced
+    def prepare_write(self, subcalendar: Subcalendar):
+        copy = subcalendar.copy()
+        ranges = self.loaded_ranges()
+        return lambda: self.backend.write_ranges(copy, ranges)
+
+    def rename(self, old_name: str, new_name: str):
+        self.backend.rename(old_name, new_name)
+
+    @property
+    def name(self):
+        return self.backend.name
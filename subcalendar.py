@@ -1,34 +1,71 @@
 # subcalendar.py
 
 import os
-from typing import List
-from datetime import datetime
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List
+from datetime import date, datetime
+from utils import write_atomic
+
+# YYYYMMDD -> date ordinal. slicing the digits is much faster than strptime, which stays as the
+# fallback so odd but previously accepted inputs keep parsing the same way
+def parse_date(value: str) -> int:
+    if len(value) == 8 and value.isdigit():
+        return date(int(value[:4]), int(value[4:6]), int(value[6:])).toordinal()
+    return datetime.strptime(value, "%Y%m%d").toordinal()
 
 class Assignment:
+    # slotted with the due date kept as a single ordinal int; year/month/day/date are derived from it
+    __slots__ = ("name", "completed", "ordinal", "studytime")
+
     def __init__(self, name: str, date: str, completed: bool, studytime: int = 0):
         self.name = name
         self.completed = completed
-        self.date = datetime.strptime(date, "%Y%m%d").date()
-        self.month = self.date.month
-        self.day = self.date.day
-        self.year = self.date.year
+        self.ordinal = parse_date(date)
         self.studytime = studytime  # in minutes
 
+    @property
+    def date(self) -> date:
+        return date.fromordinal(self.ordinal)
+
+    @property
+    def year(self) -> int:
+        return date.fromordinal(self.ordinal).year
+
+    @property
+    def month(self) -> int:
+        return date.fromordinal(self.ordinal).month
+
+    @property
+    def day(self) -> int:
+        return date.fromordinal(self.ordinal).day
+
+    # due date as YYYYMMDD, the storage format
+    @property
+    def date_str(self) -> str:
+        d = date.fromordinal(self.ordinal)
+        return f"{d.year:04d}{d.month:02d}{d.day:02d}"
+
     def rename(self, name: str):
         self.name = name
 
     def toggle_completion(self):
         self.completed = not self.completed
 
+    def copy(self) -> "Assignment":
+        a = Assignment.__new__(Assignment)
+        a.name, a.completed, a.ordinal, a.studytime = self.name, self.completed, self.ordinal, self.studytime
+        return a
+
     def __repr__(self):
         return f"Assignment  name: '{self.name}'  date: {self.date.strftime('%m/%d/%Y')}  completed: {self.completed}  studytime: {self.studytime} min"
 
     def to_dict(self):
+        d = date.fromordinal(self.ordinal)
         return {
             "name": self.name,
-            "year": self.year,
-            "month": self.month,
-            "day": self.day,
+            "year": d.year,
+            "month": d.month,
+            "day": d.day,
             "completed": self.completed,
             "studytime": self.studytime,
         }
@@ -43,28 +80,160 @@ class Assignment:
             studytime=data.get("studytime", 0)
         )
 
+# weeks are keyed by the ordinal of their monday, i.e. one key per iso week
+def week_key(ordinal: int) -> int:
+    return ordinal - (ordinal + 6) % 7
+
 class Subcalendar:
+    __slots__ = ("name", "_assignments", "_keys", "_week_totals", "hidden", "color", "dirty", "version")
+
     def __init__(self, name: str, color=1):
         self.name = name
-        self.assignments: List[Assignment] = []
+        # assignments are kept in date order with a parallel list of date ordinals
+        # so inserts and range lookups can bisect instead of scanning
+        self._assignments: List[Assignment] = []
+        self._keys: List[int] = []
+        self._week_totals: Dict[int, int] = {}  # week key -> study minutes, kept in step with inserts and removals
         self.hidden = False
         self.color = color
+        self.dirty = True  # changed since last written to storage. new subcalendars have never been written
+        self.version = 0  # bumped on every change to the assignments, lets derived views tell when to rebuild
+
+    @property
+    def assignments(self) -> List[Assignment]:
+        return self._assignments
+
+    @assignments.setter
+    def assignments(self, assignments: List[Assignment]):
+        # sort is stable, so assignments on the same date keep their given order
+        self._assignments = sorted(assignments, key=lambda a: a.ordinal)
+        self._keys = [a.ordinal for a in self._assignments]
+        totals = {}
+        for key, a in zip(self._keys, self._assignments):
+            if a.studytime:
+                week = key - (key + 6) % 7  # week_key, inlined since this runs once per loaded assignment
+                totals[week] = totals.get(week, 0) + a.studytime
+        self._week_totals = {week: total for week, total in totals.items() if total}
+        self._changed()
+
+    def _add_studytime(self, key: int, minutes: int):
+        if not minutes:
+            return
+        week = week_key(key)
+        total = self._week_totals.get(week, 0) + minutes
+        if total:
+            self._week_totals[week] = total
+        else:
+            del self._week_totals[week]
 
     def rename(self, name: str):
         self.name = name
+        self.dirty = True
+
+    def mark_clean(self):
+        self.dirty = False
+
+    # independent copy for writing from another thread while this one keeps being edited
+    def copy(self) -> "Subcalendar":
+        subcal = Subcalendar(self.name, self.color)
+        subcal.hidden = self.hidden
+        subcal._assignments = [a.copy() for a in self._assignments]
+        subcal._keys = list(self._keys)
+        subcal._week_totals = dict(self._week_totals)
+        subcal.dirty = self.dirty
+        subcal.version = self.version
+        return subcal
+
+    def _changed(self):
+        self.dirty = True
+        self.version += 1
 
     def insert_assignment(self, assignment: Assignment):
-        for i, existing in enumerate(self.assignments):
-            if assignment.date < existing.date:
-                self.assignments.insert(i, assignment)
-                return
-        self.assignments.append(assignment)
+        key = assignment.ordinal
+        i = bisect_right(self._keys, key)  # after any existing assignments on the same date
+        self._keys.insert(i, key)
+        self._assignments.insert(i, assignment)
+        self._add_studytime(key, assignment.studytime)
+        self._changed()
+
+    def remove_assignment(self, assignment: Assignment) -> bool:
+        key = assignment.ordinal
+        lo = bisect_left(self._keys, key)
+        hi = bisect_right(self._keys, key, lo)
+        for i in range(lo, hi):
+            if self._assignments[i] is assignment:
+                del self._keys[i]
+                del self._assignments[i]
+                self._add_studytime(key, -assignment.studytime)
+                self._changed()
+                return True
+        return False
+
+    def remove_assignments(self, assignments) -> int:
+        removed = 0
+        for a in assignments:
+            if self.remove_assignment(a):
+                removed += 1
+        return removed
+
+    # add assignments read from storage. this isn't a change, so the dirty flag is left alone
+    def load_assignments(self, assignments):
+        dirty = self.dirty
+        for a in assignments:
+            self.insert_assignment(a)
+        self.dirty = dirty
+
+    # drop assignments in a date range from memory without deleting them from storage
+    def unload_between(self, start: date, end: date):
+        lo = bisect_left(self._keys, start.toordinal())
+        hi = bisect_right(self._keys, end.toordinal(), lo)
+        for key, a in zip(self._keys[lo:hi], self._assignments[lo:hi]):
+            self._add_studytime(key, -a.studytime)
+        del self._keys[lo:hi]
+        del self._assignments[lo:hi]
+        self.version += 1
+
+    # study time edits go through the subcalendar so the weekly totals stay current
+    def set_studytime(self, assignment: Assignment, minutes: int):
+        self._add_studytime(assignment.ordinal, minutes - assignment.studytime)
+        assignment.studytime = minutes
+        self._changed()
+
+    def toggle_completion(self, assignment: Assignment):
+        assignment.toggle_completion()
+        self._changed()
+
+    def rename_assignment(self, assignment: Assignment, name: str):
+        assignment.rename(name)
+        self._changed()
+
+    # the date is part of the index key, so a move is a remove and a re-insert. returns the moved assignment
+    def move_assignment(self, assignment: Assignment, date: str) -> Assignment:
+        moved = Assignment(assignment.name, date, assignment.completed, assignment.studytime)
+        self.remove_assignment(assignment)
+        self.insert_assignment(moved)
+        return moved
+
+    # total study minutes for the week starting on the given monday
+    def studytime_for_week(self, week_start: date) -> int:
+        return self._week_totals.get(week_key(week_start.toordinal()), 0)
+
+    # inclusive range lookup, returns assignments in date order
+    def assignments_between(self, start: date, end: date) -> List[Assignment]:
+        lo = bisect_left(self._keys, start.toordinal())
+        hi = bisect_right(self._keys, end.toordinal(), lo)
+        return self._assignments[lo:hi]
+
+    def assignments_on(self, day: date) -> List[Assignment]:
+        return self.assignments_between(day, day)
 
     def toggle_hidden(self):
         self.hidden = not self.hidden
+        self.dirty = True
 
     def change_color(self, color):
         self.color = color
+        self.dirty = True
 
     def to_dict(self):
         return {
@@ -74,6 +243,20 @@ class Subcalendar:
             "assignments": [a.to_dict() for a in self.assignments]
         }
 
+    # compact wire shape: parallel arrays instead of one object per assignment. dates are
+    # date ordinals (days since 0001-01-01, so 1970-01-01 is 719163) and completed is 0 or 1
+    def to_columns(self, assignments: List[Assignment] = None) -> dict:
+        assignments = self._assignments if assignments is None else assignments
+        return {
+            "name": self.name,
+            "color": self.color,
+            "hidden": self.hidden,
+            "ordinals": [a.ordinal for a in assignments],
+            "names": [a.name for a in assignments],
+            "completed": [int(bool(a.completed)) for a in assignments],
+            "studytime": [a.studytime for a in assignments],
+        }
+
     @classmethod
     def from_dict(cls, data):
         subcal = cls(data["name"], data.get("color", 1))
@@ -84,55 +267,90 @@ class Subcalendar:
     # ---- LOCAL FILE I/O ----
     @classmethod
     def read_all_local(cls, directory: str) -> List["Subcalendar"]:
-        subcalendars = []
+        return list(cls.iter_local(directory))
+
+    # one file at a time, for callers that stream subcalendars out as they are read
+    @classmethod
+    def iter_local(cls, directory: str) -> Iterator["Subcalendar"]:
         if not os.path.exists(directory):
             os.makedirs(directory)
         for filename in os.listdir(directory):
             filepath = os.path.join(directory, filename)
-            if not os.path.isfile(filepath):
-                continue
+            if not os.path.isfile(filepath) or (filename.startswith(".") and filename.endswith(".tmp")):
+                continue # temporary files are left over from interrupted writes
             with open(filepath, "r") as file:
-                subcalendar = cls._read_from_file(filename, file)
-                subcalendars.append(subcalendar)
-        return subcalendars
+                yield cls._read_from_file(filename, file)
 
     @classmethod
     def _read_from_file(cls, name, file):
-        subcalendar = cls(name)
-        try:
-            line = file.readline()
-            subcalendar.color = int(line.strip())
-            for line in file:
-                parts = line.strip().split(",")
-                if len(parts) >= 3:
-                    name = parts[0]
-                    date = parts[1]
-                    completed = int(parts[2])
-                    studytime = int(parts[3]) if len(parts) > 3 else 0
-                    assignment = Assignment(name, date, completed, studytime)
-                    subcalendar.insert_assignment(assignment)
-        except Exception as e:
-            print(f"Error reading {name}: {e}")
+        return cls._read_from_text(name, file.read())
+
+    @classmethod
+    def _read_from_text(cls, name, text):
+        subcalendar, errors = cls.parse(name, text)
+        for line_no, message in errors:
+            print(f"Error reading {name} line {line_no}: {message}")
         return subcalendar
 
+    # bulk parser for the text format: one pass over the whole buffer, bad lines are reported and
+    # skipped rather than ending the read, and the assignments are sorted once at the end.
+    # returns the subcalendar and a list of (line number, message) errors
+    @classmethod
+    def parse(cls, name: str, text: str):
+        subcalendar = cls(name)
+        errors = []
+        lines = text.splitlines()
+        if lines:
+            try:
+                subcalendar.color = int(lines[0].strip())
+            except ValueError:
+                errors.append((1, f"invalid color {lines[0].strip()!r}"))
+
+        ordinals = {}  # archives repeat dates a lot, parse each distinct one once
+        assignments = []
+        new = Assignment.__new__
+        for line_no, line in enumerate(lines[1:], 2):
+            parts = line.strip().split(",")
+            if len(parts) < 3:
+                if parts != [""]:
+                    errors.append((line_no, "expected name,date,completed[,studytime]"))
+                continue
+            try:
+                ordinal = ordinals.get(parts[1])
+                if ordinal is None:
+                    ordinal = ordinals[parts[1]] = parse_date(parts[1])
+                completed = int(parts[2])
+                studytime = int(parts[3]) if len(parts) > 3 else 0
+            except ValueError as e:
+                errors.append((line_no, str(e)))
+                continue
+            a = new(Assignment)
+            a.name = parts[0]
+            a.ordinal = ordinal
+            a.completed = completed
+            a.studytime = studytime
+            assignments.append(a)
+
+        subcalendar.assignments = assignments
+        subcalendar.mark_clean()
+        return subcalendar, errors
+
+    # the whole file is built in memory and swapped in atomically, so a crash can't leave it truncated
     def write_local(self, directory: str):
-        filename = os.path.join(directory, self.name)
-        with open(filename, "w") as file:
-            file.write(f"{self.color}\n")
-            for a in self.assignments:
-                file.write(f"{a.name},{a.date.strftime('%Y%m%d')},{int(a.completed)},{a.studytime}\n")
+        write_atomic(os.path.join(directory, self.name), self.to_file_bytes())
+
+    def to_file_bytes(self) -> bytes:
+        return (self.to_blob() + "\n").encode("utf-8")
 
     # ---- BLOB STORAGE I/O ----
     @classmethod
     def from_blob(cls, name: str, data: str) -> "Subcalendar":
-        from io import StringIO
-        file = StringIO(data)
-        return cls._read_from_file(name, file)
+        return cls._read_from_text(name, data)
 
     def to_blob(self) -> str:
         lines = [f"{self.color}"]
         for a in self.assignments:
-            lines.append(f"{a.name},{a.date.strftime('%Y%m%d')},{int(a.completed)},{a.studytime}")
+            lines.append(f"{a.name},{a.date_str},{int(a.completed)},{a.studytime}")
         return "\n".join(lines)
 
     def __repr__(self):
@@ -0,0 +1,85 @@
+# fake_azure.py - in-memory stand-in for an azure ContainerClient, used by tests and benchmarks
+
+import threading
+import time
+from types import SimpleNamespace
+
+class FakeDownload:
+    def __init__(self, data: bytes, etag: str):
+        self.data = data
+        self.properties = SimpleNamespace(etag=etag, last_modified=None)
+
+    def readall(self) -> bytes:
+        return self.data
+
+class FakeBlobClient:
+    def __init__(self, container, name):
+        self.container = container
+        self.name = name
+        self.url = f"fake://{name}"
+
+    def download_blob(self):
+        self.container.simulate_round_trip()
+        return FakeDownload(self.container.blobs[self.name], self.container.etags[self.name])
+
+    def upload_blob(self, data, overwrite=False):
+        self.container.simulate_round_trip()
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.container.blobs[self.name] = data
+        return {"etag": self.container.touch(self.name), "last_modified": None}
+
+    def start_copy_from_url(self, url):
+        self.container.simulate_round_trip()
+        source = url[len("fake://"):]
+        self.container.blobs[self.name] = self.container.blobs[source]
+        self.container.touch(self.name)
+        self.container.copy_polls_left = self.container.pending_copy_polls
+
+    def get_blob_properties(self):
+        self.container.simulate_round_trip()
+        self.container.property_calls += 1
+        if self.container.copy_polls_left:
+            self.container.copy_polls_left -= 1
+            return SimpleNamespace(copy=SimpleNamespace(status="pending"))
+        return SimpleNamespace(copy=SimpleNamespace(status="success"))
+
+    def delete_blob(self):
+        self.container.simulate_round_trip()
+        del self.container.blobs[self.name]
+        del self.container.etags[self.name]
+
+class FakeContainerClient:
+    # latency is slept on every call to mimic a network round trip. a copy reports
+    # pending for the first pending_copy_polls status checks, like a slow server-side copy
+    def __init__(self, blobs=None, latency: float = 0.0, pending_copy_polls: int = 0):
+        self.blobs = dict(blobs or {})
+        self.latency = latency
+        self.pending_copy_polls = pending_copy_polls
+        self.copy_polls_left = 0
+        self.property_calls = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.version = 0
+        self.etags = {}
+        for name in self.blobs:
+            self.touch(name)
+
+    # give a blob a fresh etag, as the service does on every write
+    def touch(self, name) -> str:
+        self.version += 1
+        self.etags[name] = f'"0x{self.version:x}"'
+        return self.etags[name]
+
+    def simulate_round_trip(self):
+        with self.lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def list_blobs(self):
+        self.simulate_round_trip()
+        return [SimpleNamespace(name=name, etag=self.etags[name], last_modified=None) for name in sorted(self.blobs)]
+
+    def get_blob_client(self, name):
+        return FakeBlobClient(self, name)
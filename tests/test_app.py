@@ -0,0 +1,296 @@
+# test_app.py
+
+import unittest
+import app as app_module
+import columnar
+from storage.backend_base import StorageBackend
+from subcalendar import Assignment, Subcalendar
+
+# hands out copies on read, like a real backend does
+class MemoryStorage(StorageBackend):
+    def __init__(self, subcalendars):
+        self.subcalendars = {sc.name: sc for sc in subcalendars}
+        self.reads = 0
+
+    def read_all(self):
+        self.reads += 1
+        return [Subcalendar.from_dict(sc.to_dict()) for sc in self.subcalendars.values()]
+
+
+    def write(self, subcalendar):
+        self.subcalendars[subcalendar.name] = subcalendar
+
+    def rename(self, old_name, new_name):
+        self.subcalendars[new_name] = self.subcalendars.pop(old_name)
+
+class AppTestCase(unittest.TestCase):
+    def setUp(self):
+        self.storage = MemoryStorage([
+            Subcalendar.from_blob("cop4504", "1\nWeek 2,20250615,1,30\nWeek 3,20250621,0,45"),
+            Subcalendar.from_blob("mac2311", "3\nQuiz,20250702,0,60"),
+        ])
+        self.original_storage = app_module.storage
+        app_module.storage = self.storage
+        app_module.cache.invalidate()
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        app_module.storage = self.original_storage
+        app_module.cache.invalidate()
+
+class TestGetSubcalendars(AppTestCase):
+    def test_get_is_cached_until_post(self):
+        first = self.client.get("/subcalendars")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([sc["name"] for sc in first.get_json()], ["cop4504", "mac2311"])
+        self.client.get("/subcalendars")
+        self.assertEqual(self.storage.reads, 1)
+
+        self.client.post("/subcalendars", json={"name": "new", "assignments": []})
+        self.assertEqual(len(self.client.get("/subcalendars").get_json()), 3)
+        self.assertEqual(self.storage.reads, 2)
+
+    def test_conditional_get(self):
+        first = self.client.get("/subcalendars")
+        etag = first.headers["ETag"]
+        cached = self.client.get("/subcalendars", headers={"If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.data, b"")
+
+        self.client.post("/subcalendars", json={"name": "new", "assignments": []})
+        changed = self.client.get("/subcalendars", headers={"If-None-Match": etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers["ETag"], etag)
+
+class TestGetAssignments(AppTestCase):
+    def test_date_range(self):
+        data = self.client.get("/assignments?from=20250601&to=20250630").get_json()
+        self.assertEqual([sc["name"] for sc in data], ["cop4504", "mac2311"])
+        self.assertEqual([a["name"] for a in data[0]["assignments"]], ["Week 2", "Week 3"])
+        self.assertEqual(data[1]["assignments"], [])
+
+    def test_subcal_and_completed_filters(self):
+        data = self.client.get("/assignments?subcal=cop4504&completed=false").get_json()
+        self.assertEqual(len(data), 1)
+        self.assertEqual([a["name"] for a in data[0]["assignments"]], ["Week 3"])
+
+    def test_bad_arguments(self):
+        self.assertEqual(self.client.get("/assignments?from=june").status_code, 400)
+        self.assertEqual(self.client.get("/assignments?completed=maybe").status_code, 400)
+
+class TestAssignmentChanges(AppTestCase):
+    def test_create_update_delete(self):
+        response = self.client.post("/subcalendars/mac2311/assignments", json={"name": "Exam", "year": 2025, "month": 7, "day": 9, "studytime": 90})
+        self.assertEqual(response.status_code, 201)
+        response = self.client.patch("/subcalendars/mac2311/assignments", json={
+            "match": {"name": "Quiz", "year": 2025, "month": 7, "day": 2},
+            "completed": True, "name": "Quiz 1", "to": {"year": 2025, "month": 7, "day": 3},
+        })
+        self.assertEqual(response.status_code, 200)
+        self.client.delete("/subcalendars/mac2311/assignments", json={"match": {"name": "Exam", "year": 2025, "month": 7, "day": 9}})
+
+        stored = self.storage.subcalendars["mac2311"]
+        self.assertEqual([(a.name, a.day, a.completed) for a in stored.assignments], [("Quiz 1", 3, True)])
+
+    def test_batch_is_all_or_nothing(self):
+        response = self.client.post("/subcalendars/mac2311/changes", json=[
+            {"op": "delete", "match": {"name": "Quiz", "year": 2025, "month": 7, "day": 2}},
+            {"op": "delete", "match": {"name": "Missing", "year": 2025, "month": 7, "day": 2}},
+        ])
+        self.assertEqual(response.status_code, 404)
+        data = self.client.get("/subcalendars").get_json()
+        self.assertEqual(len(data[1]["assignments"]), 1)
+        # the failed batch was applied to a copy, so the cached subcalendars are still good
+        self.assertEqual(self.storage.reads, 1)
+
+    def test_changes_update_cache_without_reloading(self):
+        self.client.get("/subcalendars")
+        for day in (3, 4, 5):
+            response = self.client.post("/subcalendars/mac2311/assignments", json={"name": f"HW{day}", "year": 2025, "month": 7, "day": day})
+            self.assertEqual(response.status_code, 201)
+        data = self.client.get("/subcalendars").get_json()
+        self.assertEqual([a["name"] for a in data[1]["assignments"]], ["Quiz", "HW3", "HW4", "HW5"])
+        self.assertEqual(self.storage.reads, 1)
+
+    def test_non_object_bodies(self):
+        for method in ("post", "patch", "delete"):
+            response = getattr(self.client, method)("/subcalendars/mac2311/assignments", json=[1, 2])
+            self.assertEqual(response.status_code, 400, method)
+        response = self.client.post("/subcalendars/mac2311/changes", json=[{"op": "create", "assignment": [1]}])
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_subcalendar(self):
+        response = self.client.post("/subcalendars/nope/changes", json=[])
+        self.assertEqual(response.status_code, 404)
+
+    def test_indexed_backend(self):
+        import os
+        import tempfile
+        from storage.sqlite import SQLiteStorageBackend
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = SQLiteStorageBackend(os.path.join(tmp, "calicula.db"))
+            for sc in self.storage.read_all():
+                storage.write(sc)
+            app_module.storage = storage
+            data = self.client.get("/assignments?from=20250601&to=20250630&completed=false").get_json()
+            self.assertEqual([sc["name"] for sc in data], ["cop4504", "mac2311"])
+            self.assertEqual([a["name"] for a in data[0]["assignments"]], ["Week 3"])
+            self.assertEqual(data[1]["assignments"], [])
+
+    def test_sqlite_writes_only_changed_rows(self):
+        import os
+        import tempfile
+        from storage.sqlite import SQLiteStorageBackend
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = SQLiteStorageBackend(os.path.join(tmp, "calicula.db"))
+            for sc in self.storage.read_all():
+                storage.write(sc)
+            app_module.storage = storage
+            app_module.cache.invalidate()
+            ids = dict(storage._connect().execute("SELECT name, id FROM assignments"))
+
+            response = self.client.post("/subcalendars/cop4504/changes", json=[
+                {"op": "create", "assignment": {"name": "Week 4", "year": 2025, "month": 6, "day": 28, "studytime": 20}},
+                {"op": "update", "match": {"name": "Week 2", "year": 2025, "month": 6, "day": 15}, "studytime": 35},
+                {"op": "move", "match": {"name": "Week 4", "year": 2025, "month": 6, "day": 28}, "to": {"year": 2025, "month": 6, "day": 21}},
+            ])
+            self.assertEqual(response.status_code, 200)
+            self.client.delete("/subcalendars/cop4504/assignments", json={"match": {"name": "Week 3", "year": 2025, "month": 6, "day": 21}})
+
+            stored = {sc.name: sc for sc in storage.read_all()}["cop4504"]
+            self.assertEqual([(a.name, a.day, a.studytime) for a in stored.assignments], [("Week 2", 15, 35), ("Week 4", 21, 20)])
+            rows = dict(storage._connect().execute("SELECT name, id FROM assignments"))
+            self.assertEqual(rows["Week 2"], ids["Week 2"])  # updated in place
+            self.assertEqual(rows["Quiz"], ids["Quiz"])
+
+@unittest.skipUnless(columnar.available(), "numpy not installed")
+class TestStats(AppTestCase):
+    def test_totals_and_grouping(self):
+        data = self.client.get("/stats?from=20250601&to=20250731&by=month").get_json()
+        self.assertEqual(data["totals"], {"count": 3, "completed": 1, "studytime": 135})
+        self.assertEqual([m["period"] for m in data["month"]], ["2025-06", "2025-07"])
+        self.assertEqual(data["month"][1]["studytime"], 60)
+
+        data = self.client.get("/stats?subcal=cop4504").get_json()
+        self.assertEqual(data["totals"]["count"], 2)
+        self.assertEqual(self.client.get("/stats?by=year").status_code, 400)
+        for by in ("day", "week", "month"):
+            self.assertEqual(self.client.get(f"/stats?from=20250201&to=20250101&by={by}").status_code, 400)
+
+class TestMetrics(AppTestCase):
+    def test_server_timing_and_metrics(self):
+        response = self.client.get("/subcalendars")
+        timing = response.headers["Server-Timing"]
+        self.assertIn("storage_read_all;dur=", timing)
+        self.assertIn("serialize;dur=", timing)
+        self.assertIn("total;dur=", timing)
+        # served from the cache, so no storage time this time
+        self.assertNotIn("storage_read_all", self.client.get("/subcalendars").headers["Server-Timing"])
+
+        text = self.client.get("/metrics").get_data(as_text=True)
+        self.assertIn('calicula_http_request_duration_seconds_bucket{method="GET",route="/subcalendars",le="+Inf"}', text)
+        self.assertIn('calicula_http_requests_total{method="GET",route="/subcalendars",status="200"}', text)
+        self.assertIn('calicula_http_response_size_bytes_count{method="GET",route="/subcalendars"}', text)
+        self.assertIn('calicula_phase_duration_seconds_count{phase="storage.read_all"}', text)
+
+class TestStreamingGet(AppTestCase):
+    def test_stream_and_ndjson_match_cached_payload(self):
+        import json
+
+        streamed = self.client.get("/subcalendars?stream=1")
+        self.assertTrue(streamed.is_streamed)
+        self.assertEqual(streamed.mimetype, "application/json")
+        streamed = json.loads(streamed.get_data())
+        ndjson = self.client.get("/subcalendars", headers={"Accept": "application/x-ndjson"})
+        self.assertEqual(ndjson.mimetype, "application/x-ndjson")
+        ndjson = [json.loads(line) for line in ndjson.get_data().splitlines()]
+        # streaming reads storage directly instead of filling the cache
+        self.assertEqual(self.storage.reads, 2)
+
+        expected = self.client.get("/subcalendars").get_json()
+        self.assertEqual(streamed, expected)
+        self.assertEqual(ndjson, expected)
+
+        # a fresh cache is streamed without reading storage again
+        self.assertEqual(json.loads(self.client.get("/subcalendars?format=ndjson&stream=1").get_data().splitlines()[0]), expected[0])
+        self.assertEqual(self.storage.reads, 3)
+
+class TestCompactAndCompressed(AppTestCase):
+    def test_columnar_shape(self):
+        from datetime import date
+
+        data = self.client.get("/subcalendars?shape=columnar").get_json()
+        self.assertEqual(data[0], {
+            "name": "cop4504", "color": 1, "hidden": False,
+            "ordinals": [date(2025, 6, 15).toordinal(), date(2025, 6, 21).toordinal()],
+            "names": ["Week 2", "Week 3"], "completed": [1, 0], "studytime": [30, 45],
+        })
+        month = self.client.get("/assignments?from=20250701&to=20250731&shape=columnar").get_json()
+        self.assertEqual([(sc["name"], sc["names"]) for sc in month], [("cop4504", []), ("mac2311", ["Quiz"])])
+        self.assertEqual(self.client.get("/subcalendars?shape=rows").status_code, 400)
+
+    def test_gzip_negotiation_and_etags(self):
+        import gzip
+        import json
+
+        # enough assignments to pass the minimum size
+        self.storage.subcalendars["cop4504"] = Subcalendar.from_blob("cop4504", "1\n" + "\n".join(f"A{i},202506{i % 28 + 1:02d},0,30" for i in range(100)))
+        plain = self.client.get("/subcalendars")
+        self.assertNotIn("Content-Encoding", plain.headers)
+        self.assertIn("Accept-Encoding", plain.headers["Vary"])
+
+        packed = self.client.get("/subcalendars", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(packed.headers["Content-Encoding"], "gzip")
+        self.assertLess(len(packed.data), len(plain.data))
+        self.assertEqual(json.loads(gzip.decompress(packed.data)), plain.get_json())
+        self.assertNotEqual(packed.headers["ETag"], plain.headers["ETag"])
+        cached = self.client.get("/subcalendars", headers={"Accept-Encoding": "gzip", "If-None-Match": packed.headers["ETag"]})
+        self.assertEqual(cached.status_code, 304)
+
+        streamed = self.client.get("/subcalendars?format=ndjson", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(streamed.headers["Content-Encoding"], "gzip")
+        lines = gzip.decompress(streamed.get_data()).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], plain.get_json())
+
+        other = self.client.get("/assignments", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(other.headers["Content-Encoding"], "gzip")
+
+class TestSharedCache(AppTestCase):
+    def test_workers_share_loads_and_invalidations(self):
+        import os
+        import tempfile
+        from shared_cache import SharedCache
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "api.db")
+            # two caches standing in for two worker processes
+            first = app_module.SubcalendarCache(30, SharedCache(path))
+            second = app_module.SubcalendarCache(30, SharedCache(path))
+
+            _, payload, etag = first.get()
+            subcalendars, shared_payload, shared_etag = second.get()
+            self.assertEqual(self.storage.reads, 1)
+            self.assertEqual((shared_payload, shared_etag), (payload, etag))
+            self.assertEqual([sc.name for sc in subcalendars], ["cop4504", "mac2311"])
+            self.assertFalse(any(sc.dirty for sc in subcalendars))
+
+            # a write handled by the first worker drops the second worker's copy too
+            self.assertIsNotNone(second.peek())
+            self.storage.subcalendars["new"] = Subcalendar.from_blob("new", "0")
+            first.invalidate()
+            self.assertIsNone(second.peek())
+            subcalendars, _, _ = second.get()
+            self.assertEqual(len(subcalendars), 3)
+            self.assertEqual(self.storage.reads, 2)
+            first.get()
+            self.assertEqual(self.storage.reads, 2)
+
+            # a written copy replaces the writer's cached one and is shared, without reading storage
+            edited = subcalendars[0].copy()
+            edited.insert_assignment(Assignment("Week 4", "20250628", False, 20))
+            self.storage.write(edited)
+            second.replace(edited)
+            self.assertIsNone(first.peek())
+            for cache in (first, second):
+                self.assertEqual(len(cache.get()[0][0].assignments), 3)
+            self.assertEqual(self.storage.reads, 2)
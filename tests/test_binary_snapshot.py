@@ -0,0 +1,44 @@
+# test_binary_snapshot.py
+
+import os
+import tempfile
+import unittest
+from datetime import date
+import binary_snapshot
+from binary_snapshot import BinarySnapshot
+from subcalendar import Subcalendar
+
+TEXT = "4\nWeek 2,20250615,1,30\nWeek 3,20250621,0,45\nQuiz,20250702,0,60\nWeek 3,20250801,1,0"
+
+class TestBinarySnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.text_dir = os.path.join(self.tmp.name, "text")
+        self.binary_dir = os.path.join(self.tmp.name, "binary")
+        os.makedirs(self.text_dir)
+        with open(os.path.join(self.text_dir, "cop4504"), "w") as file:
+            file.write(TEXT)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_through_text(self):
+        self.assertEqual(binary_snapshot.text_to_binary(self.text_dir, self.binary_dir), 1)
+        back_dir = os.path.join(self.tmp.name, "back")
+        self.assertEqual(binary_snapshot.binary_to_text(self.binary_dir, back_dir), 1)
+
+        original = Subcalendar.read_all_local(self.text_dir)[0]
+        converted = Subcalendar.read_all_local(back_dir)[0]
+        self.assertEqual(converted.to_dict(), original.to_dict())
+
+    def test_range_reads(self):
+        binary_snapshot.text_to_binary(self.text_dir, self.binary_dir)
+        snapshot = BinarySnapshot(os.path.join(self.binary_dir, "cop4504.clsb"))
+        try:
+            self.assertEqual((snapshot.name, snapshot.color, snapshot.count), ("cop4504", 4, 4))
+            june = snapshot.assignments_between(date(2025, 6, 1), date(2025, 6, 30))
+            self.assertEqual([(a.name, a.studytime, bool(a.completed)) for a in june], [("Week 2", 30, True), ("Week 3", 45, False)])
+            self.assertEqual(snapshot.assignments_between(date(2025, 6, 22), date(2025, 7, 1)), [])
+            self.assertEqual(len(snapshot.assignments_between(date(2025, 7, 2), date(2025, 8, 1))), 2)
+        finally:
+            snapshot.close()
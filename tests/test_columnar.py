@@ -0,0 +1,36 @@
+# test_columnar.py
+
+import unittest
+from datetime import date
+import columnar
+from subcalendar import Assignment, Subcalendar
+
+@unittest.skipUnless(columnar.available(), "numpy not installed")
+class TestColumnarSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.a = Subcalendar("a")
+        self.b = Subcalendar("b")
+        for day in range(1, 29):
+            self.a.insert_assignment(Assignment("x", f"202502{day:02d}", day % 2, 10))
+            self.b.insert_assignment(Assignment("y", f"202503{day:02d}", 0, 5))
+        self.snapshot = columnar.ColumnarSnapshot()
+        self.snapshot.refresh([self.a, self.b])
+
+    def test_totals_respect_hidden(self):
+        self.assertEqual(self.snapshot.totals(date(2025, 2, 1), date(2025, 3, 31)), {"count": 56, "completed": 14, "studytime": 420})
+        self.b.toggle_hidden()
+        self.assertFalse(self.snapshot.refresh([self.a, self.b]))  # visibility doesn't need a rebuild
+        self.assertEqual(self.snapshot.totals(date(2025, 2, 1), date(2025, 3, 31))["count"], 28)
+
+    def test_grouping(self):
+        weeks = self.snapshot.grouped(date(2025, 2, 24), date(2025, 3, 4), "week")
+        self.assertEqual([(w["period"], w["count"]) for w in weeks], [("2025-02-24", 7), ("2025-03-03", 2)])
+        months = self.snapshot.grouped(date(2025, 1, 1), date(2025, 12, 31), "month")
+        self.assertEqual([(m["period"], m["studytime"]) for m in months], [("2025-02", 280), ("2025-03", 140)])
+        self.assertEqual(self.snapshot.grouped(date(2025, 2, 1), date(2025, 1, 1), "day"), [])
+
+    def test_refresh_after_mutation(self):
+        self.a.insert_assignment(Assignment("z", "20250301", True, 100))
+        self.assertTrue(self.snapshot.refresh([self.a, self.b]))
+        days = self.snapshot.grouped(date(2025, 3, 1), date(2025, 3, 1), "day")
+        self.assertEqual(days, [{"period": "2025-03-01", "count": 2, "completed": 1, "studytime": 105}])
@@ -0,0 +1,20 @@
+# test_metrics.py
+
+import unittest
+import metrics
+
+class TestPrometheusMetrics(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        registry = metrics.Registry()
+        histogram = registry.histogram("h_seconds", "help text", (0.1, 1.0), ("route",))
+        for value in (0.05, 0.5, 0.7, 5):
+            histogram.observe(('/a"b',), value)
+        lines = registry.render().splitlines()
+        self.assertEqual(lines[:2], ["# HELP h_seconds help text", "# TYPE h_seconds histogram"])
+        self.assertEqual(lines[2:7], [
+            'h_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+            'h_seconds_bucket{route="/a\\"b",le="1.0"} 3',
+            'h_seconds_bucket{route="/a\\"b",le="+Inf"} 4',
+            'h_seconds_sum{route="/a\\"b"} 6.25',
+            'h_seconds_count{route="/a\\"b"} 4',
+        ])
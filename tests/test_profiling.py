@@ -0,0 +1,40 @@
+# test_profiling.py
+
+import os
+import tempfile
+import unittest
+from profiling import Timings, timed, timings
+
+class TestTimings(unittest.TestCase):
+    def test_percentiles_over_rolling_window(self):
+        t = Timings(window=100)
+        for ms in range(1, 201):  # only 101..200 stay in the window
+            t.record("draw", ms / 1000)
+        t.record("cursor", 0.001)
+
+        (name, calls, p50, p95, p99, worst), cursor = t.summary()
+        self.assertEqual((name, calls), ("draw", 200))
+        self.assertAlmostEqual(p50, 151)
+        self.assertAlmostEqual(p95, 196)
+        self.assertAlmostEqual(p99, 200)
+        self.assertAlmostEqual(worst, 200)
+        self.assertEqual(cursor[:2], ("cursor", 1))
+
+    def test_decorator_and_dump(self):
+        @timed("test.decorated")
+        def work(x):
+            return x * 2
+
+        self.assertEqual(work(2), 4)
+        with self.assertRaises(ZeroDivisionError):
+            with timings.time("test.block"):
+                1 / 0
+        names = {row[0]: row[1] for row in timings.summary()}
+        self.assertEqual(names["test.decorated"], 1)
+        self.assertEqual(names["test.block"], 1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "stats.txt")
+            timings.dump(path)
+            with open(path) as file:
+                self.assertIn("test.decorated", file.read())
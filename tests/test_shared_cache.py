@@ -0,0 +1,54 @@
+# test_shared_cache.py
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from shared_cache import SharedCache
+
+class TestSharedCache(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "cache", "api.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_store_and_load_across_instances(self):
+        writer, reader = SharedCache(self.path), SharedCache(self.path)
+        self.assertIsNone(reader.load())
+        self.assertTrue(writer.store(0, "etag", b"[]", time.time() + 30))
+        self.assertEqual(tuple(reader.load()[:3]), (0, "etag", b"[]"))
+
+    def test_invalidate_bumps_generation_and_drops_payload(self):
+        writer, other = SharedCache(self.path), SharedCache(self.path)
+        writer.store(0, "etag", b"[]", time.time() + 30)
+        other.invalidate()
+        self.assertEqual(writer.generation(), 1)
+        self.assertIsNone(writer.load())
+        # a load that started before the write must not be published over it
+        self.assertFalse(writer.store(0, "stale", b"[]", time.time() + 30))
+        self.assertIsNone(writer.load())
+
+    def test_expired_payload_is_not_loaded(self):
+        cache = SharedCache(self.path)
+        cache.store(0, "etag", b"[]", time.time() - 1)
+        self.assertIsNone(cache.load())
+
+    def test_write_lock_is_exclusive_between_instances(self):
+        first, second = SharedCache(self.path), SharedCache(self.path)
+        order = []
+        def write():
+            with second.write_lock():
+                order.append("second")
+        with first.write_lock():
+            thread = threading.Thread(target=write)
+            thread.start()
+            time.sleep(0.05)
+            order.append("first")
+        thread.join()
+        self.assertEqual(order, ["first", "second"])
+
+if __name__ == "__main__":
+    unittest.main()
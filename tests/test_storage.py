@@ -0,0 +1,593 @@
+# test_storage.py
+
+import os
+import unittest
+from storage.backend_base import StorageBackend
+from subcalendar import Assignment, Subcalendar
+
+class MemoryStorageBackend(StorageBackend):
+    def __init__(self):
+        self.written = []
+
+    def read_all(self):
+        return []
+
+    def write(self, subcalendar):
+        self.written.append(subcalendar.name)
+
+    def rename(self, old_name, new_name):
+        pass
+
+class TestWriteDirty(unittest.TestCase):
+    def test_only_dirty_subcalendars_written(self):
+        a = Subcalendar.from_blob("a", "1\nA,20250714,0,30")
+        b = Subcalendar.from_blob("b", "2\nB,20250714,0,30")
+        self.assertFalse(a.dirty)
+        self.assertFalse(b.dirty)
+
+        b.toggle_completion(b.assignments[0])
+        storage = MemoryStorageBackend()
+        self.assertEqual(storage.write_dirty([a, b]), 1)
+        self.assertEqual(storage.written, ["b"])
+        self.assertFalse(b.dirty)
+
+        # nothing left to write
+        self.assertEqual(storage.write_dirty([a, b]), 0)
+
+    def test_mutations_mark_dirty(self):
+        cal = Subcalendar.from_blob("a", "1")
+        for mutate in (
+            lambda: cal.insert_assignment(Assignment("A", "20250714", False)),
+            lambda: cal.remove_assignment(cal.assignments[0]),
+            lambda: cal.rename("b"),
+            lambda: cal.change_color(2),
+            lambda: cal.toggle_hidden(),
+        ):
+            cal.mark_clean()
+            mutate()
+            self.assertTrue(cal.dirty)
+
+class TestAzureBlobStorageBackend(unittest.TestCase):
+    def test_parallel_read_keeps_listing_order(self):
+        from fake_azure import FakeContainerClient
+        from storage.azure_blob import AzureBlobStorageBackend
+
+        blobs = {f"cal{i:02d}": f"{i % 5 + 1}\nA{i},20250714,0,{i}".encode() for i in range(20)}
+        storage = AzureBlobStorageBackend(FakeContainerClient(blobs, latency=0.001), read_concurrency=4)
+        subcalendars = storage.read_all()
+
+        self.assertEqual([sc.name for sc in subcalendars], sorted(blobs))
+        self.assertEqual(subcalendars[3].assignments[0].studytime, 3)
+        self.assertFalse(any(sc.dirty for sc in subcalendars))
+
+    def test_cache_skips_unchanged_blobs(self):
+        import tempfile
+        from fake_azure import FakeContainerClient
+        from storage.azure_blob import AzureBlobStorageBackend
+
+        blobs = {f"cal{i}": f"1\nA{i},20250714,0,{i}".encode() for i in range(5)}
+        container = FakeContainerClient(blobs)
+        with tempfile.TemporaryDirectory() as cache_dir:
+            AzureBlobStorageBackend(container, cache_dir=cache_dir).read_all()
+
+            # a fresh backend over a warm cache only lists the container
+            container.calls = 0
+            storage = AzureBlobStorageBackend(container, cache_dir=cache_dir)
+            self.assertEqual(len(storage.read_all()), 5)
+            self.assertEqual(container.calls, 1)
+
+            # a write keeps the cache current, a change made elsewhere is re-downloaded
+            cal = Subcalendar.from_blob("cal0", "2")
+            storage.write(cal)
+            container.get_blob_client("cal1").upload_blob("3", overwrite=True)
+            container.calls = 0
+            subcalendars = {sc.name: sc for sc in storage.read_all()}
+            self.assertEqual(container.calls, 2)
+            self.assertEqual(subcalendars["cal0"].color, 2)
+            self.assertEqual(subcalendars["cal1"].color, 3)
+
+    def test_rename_waits_for_pending_copy(self):
+        from fake_azure import FakeContainerClient
+        from storage import azure_blob
+        from storage.azure_blob import AzureBlobStorageBackend
+
+        container = FakeContainerClient({"old": b"1\nA,20250714,0,30"}, pending_copy_polls=3)
+        storage = AzureBlobStorageBackend(container, cache_dir="none")
+        initial, azure_blob.COPY_POLL_INITIAL = azure_blob.COPY_POLL_INITIAL, 0.001
+        try:
+            storage.rename("old", "new")
+        finally:
+            azure_blob.COPY_POLL_INITIAL = initial
+
+        self.assertEqual(container.property_calls, 4)
+        self.assertEqual(sorted(container.blobs), ["new"])
+
+    def test_blob_cache_concurrent_puts_and_saves(self):
+        import tempfile
+        import threading
+        from storage.blob_cache import BlobCache
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = BlobCache(cache_dir)
+            errors = []
+            def work(n):
+                try:
+                    for i in range(50):
+                        cache.put(f"cal{n}", f"etag{i}", f"{n} {i}")
+                        cache.save()
+                except Exception as e:
+                    errors.append(e)
+            threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(errors, [])
+            reloaded = BlobCache(cache_dir)
+            self.assertEqual([reloaded.get(f"cal{n}", "etag49") for n in range(4)], [f"{n} 49" for n in range(4)])
+            self.assertIsNone(reloaded.get("cal0", "etag48"))
+            # one file per blob plus the index and its lock, no temporaries or older versions left behind
+            self.assertEqual(len(os.listdir(cache_dir)), 6)
+
+    def test_blob_cache_merges_index_between_processes(self):
+        import tempfile
+        from storage.blob_cache import BlobCache
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first, second = BlobCache(cache_dir), BlobCache(cache_dir)
+            first.put("a", "1", "a at 1")
+            first.put("b", "1", "b at 1")
+            first.save()
+            second.put("b", "2", "b at 2")  # second never saw first's entries
+            second.put("c", "1", "c at 1")
+            second.save()
+            first.discard("a")
+            first.save()
+
+            reloaded = BlobCache(cache_dir)
+            self.assertEqual(sorted(reloaded.index), ["b", "c"])
+            self.assertEqual(reloaded.get("b", "2"), "b at 2")
+            # b's first version and the discarded a are gone from disk
+            self.assertEqual(len(os.listdir(cache_dir)), 4)
+
+class TestJournalStorageBackend(unittest.TestCase):
+    def setUp(self):
+        import tempfile
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_write_appends_changes_and_replays(self):
+        import os
+        from storage.journal import JournalStorageBackend
+
+        storage = JournalStorageBackend(self.directory, compact_threshold=1000)
+        cal = Subcalendar("cop4504", 2)
+        cal.insert_assignment(Assignment("A", "20250714", False, 30))
+        cal.insert_assignment(Assignment("B", "20250715", False))
+        storage.write(cal)
+        size = os.path.getsize(os.path.join(self.directory, "cop4504.log"))
+
+        cal.toggle_completion(cal.assignments[0])
+        storage.write(cal)
+        # one toggle record, not a rewrite of the subcalendar
+        with open(os.path.join(self.directory, "cop4504.log")) as file:
+            self.assertEqual(len(file.readlines()), 4)
+        self.assertGreater(os.path.getsize(os.path.join(self.directory, "cop4504.log")), size)
+
+        loaded = JournalStorageBackend(self.directory).read_all()
+        self.assertEqual(len(loaded), 1)
+        self.assertEqual(loaded[0].color, 2)
+        self.assertEqual([(a.name, bool(a.completed)) for a in loaded[0].assignments], [("A", True), ("B", False)])
+
+    def test_compaction_and_torn_record(self):
+        import os
+        from storage.journal import JournalStorageBackend
+
+        storage = JournalStorageBackend(self.directory, compact_threshold=5)
+        cal = Subcalendar("cal", 1)
+        for day in range(10, 20):
+            cal.insert_assignment(Assignment(f"A{day}", f"202507{day}", False))
+            storage.write(cal)
+        storage.wait_for_compaction()
+        self.assertTrue(os.path.exists(os.path.join(self.directory, "cal.snapshot")))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "cal.log.old")))
+
+        # an append cut off by a crash is ignored on replay
+        with open(os.path.join(self.directory, "cal.log"), "a") as file:
+            file.write('{"seq": 99, "op": "ins')
+        storage = JournalStorageBackend(self.directory)
+        loaded = storage.read_all()
+        self.assertEqual(len(loaded[0].assignments), 10)
+
+        # and the next append still replays
+        loaded[0].insert_assignment(Assignment("B", "20250801", False))
+        storage.write(loaded[0])
+        self.assertEqual(len(JournalStorageBackend(self.directory).read_all()[0].assignments), 11)
+
+    def test_compaction_swaps_files_under_the_lock(self):
+        import os
+        import time
+        from storage.journal import JournalStorageBackend
+
+        storage = JournalStorageBackend(self.directory, compact_threshold=1000)
+        cal = Subcalendar("cal", 1)
+        for day in range(10, 15):
+            cal.insert_assignment(Assignment(f"A{day}", f"202507{day}", False))
+            storage.write(cal)
+
+        with storage.lock:
+            storage._start_compaction("cal", storage.states["cal"])
+            deadline = time.monotonic() + 5
+            while not any(f.endswith(".tmp") for f in os.listdir(self.directory)) and time.monotonic() < deadline:
+                time.sleep(0.001)
+            time.sleep(0.05)
+            # the snapshot is written but a replay holding the lock still sees the set aside records
+            self.assertTrue(os.path.exists(os.path.join(self.directory, "cal.log.old")))
+            self.assertFalse(os.path.exists(os.path.join(self.directory, "cal.snapshot")))
+            self.assertEqual(sum(storage._replay("cal").rows.values()), 5)
+        storage.wait_for_compaction()
+        self.assertEqual(len(storage.read_all()[0].assignments), 5)
+
+    def test_rename_interrupted_midway_is_finished_on_open(self):
+        import json
+        import os
+        from storage.journal import JournalStorageBackend
+
+        storage = JournalStorageBackend(self.directory, compact_threshold=3)
+        cal = Subcalendar("old", 1)
+        for day in range(10, 15):
+            cal.insert_assignment(Assignment(f"A{day}", f"202507{day}", False))
+            storage.write(cal)
+        storage.wait_for_compaction()
+
+        # the process died after moving the snapshot but before the log
+        with open(os.path.join(self.directory, "old.rename"), "w") as file:
+            json.dump({"to": "new"}, file)
+        os.replace(os.path.join(self.directory, "old.snapshot"), os.path.join(self.directory, "new.snapshot"))
+
+        loaded = JournalStorageBackend(self.directory).read_all()
+        self.assertEqual([(sc.name, len(sc.assignments)) for sc in loaded], [("new", 5)])
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "old.rename")))
+
+        storage = JournalStorageBackend(self.directory)
+        storage.rename("new", "newer")
+        self.assertEqual([(sc.name, len(sc.assignments)) for sc in storage.read_all()], [("newer", 5)])
+
+class TestSQLiteStorageBackend(unittest.TestCase):
+    def setUp(self):
+        import os
+        import tempfile
+        from storage.sqlite import SQLiteStorageBackend
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = SQLiteStorageBackend(os.path.join(self.tmp.name, "calicula.db"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_and_rename(self):
+        cal = Subcalendar("cop4504", 3)
+        cal.insert_assignment(Assignment("B", "20250715", True, 45))
+        cal.insert_assignment(Assignment("A", "20250714", False, 30))
+        self.storage.write(cal)
+        cal.remove_assignment(cal.assignments[1])
+        self.storage.write(cal)
+        self.storage.rename("cop4504", "cop4505")
+
+        loaded = self.storage.read_all()
+        self.assertEqual([sc.name for sc in loaded], ["cop4505"])
+        self.assertEqual(loaded[0].color, 3)
+        self.assertEqual([(a.name, a.studytime) for a in loaded[0].assignments], [("A", 30)])
+
+    def test_write_changes_falls_back_to_full_write(self):
+        cal = Subcalendar("cop4504")
+        cal.insert_assignment(Assignment("A", "20250714", False, 30))
+        self.storage.write(cal)
+        # another writer removed A, so the change can't be matched and our copy is written whole
+        self.storage.write(Subcalendar("cop4504"))
+        cal.set_studytime(cal.assignments[0], 40)
+        self.storage.write_changes(cal, [{"op": "update", "match": {"name": "A", "year": 2025, "month": 7, "day": 14}, "studytime": 40}])
+        self.assertEqual([(a.name, a.studytime) for a in self.storage.read_all()[0].assignments], [("A", 40)])
+
+    def test_iter_all_matches_read_all(self):
+        for i, name in enumerate(("b", "a", "c")):
+            cal = Subcalendar(name, i + 1)
+            cal.assignments = [Assignment(f"{name}{j}", f"2025{j % 12 + 1:02d}01", j % 2, j) for j in range(i * 3)]
+            self.storage.write(cal)
+        self.assertEqual([sc.to_dict() for sc in self.storage.iter_all()], [sc.to_dict() for sc in self.storage.read_all()])
+
+    def test_query_assignments(self):
+        from datetime import date
+        a = Subcalendar("a")
+        b = Subcalendar("b")
+        for day in range(1, 31):
+            a.insert_assignment(Assignment(f"a{day}", f"202506{day:02d}", day % 2, 10))
+            b.insert_assignment(Assignment(f"b{day}", f"202507{day:02d}", False, 10))
+        self.storage.write(a)
+        self.storage.write(b)
+
+        found = self.storage.query_assignments(date(2025, 6, 29), date(2025, 7, 2))
+        self.assertEqual([x.name for x in found["a"]], ["a29", "a30"])
+        self.assertEqual([x.name for x in found["b"]], ["b1", "b2"])
+
+        found = self.storage.query_assignments(date(2025, 6, 1), date(2025, 6, 5), names=["a"], completed=True)
+        self.assertEqual(list(found), ["a"])
+        self.assertEqual([x.name for x in found["a"]], ["a1", "a3", "a5"])
+        self.assertEqual([sc.name for sc in self.storage.list_subcalendars()], ["a", "b"])
+
+class TestWindowedStorage(unittest.TestCase):
+    def setUp(self):
+        import os
+        import tempfile
+        from storage.sqlite import SQLiteStorageBackend
+        self.tmp = tempfile.TemporaryDirectory()
+        self.backend = SQLiteStorageBackend(os.path.join(self.tmp.name, "calicula.db"))
+        cal = Subcalendar("cal")
+        for month in range(1, 13):
+            for day in (1, 15):
+                cal.insert_assignment(Assignment(f"{month}-{day}", f"2025{month:02d}{day:02d}", False, 10))
+        self.backend.write(cal)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_loads_window_and_evicts(self):
+        from storage.windowed import WindowedStorage
+        storage = WindowedStorage(self.backend, radius=1, max_months=4)
+        subcalendars = storage.read_all()
+        self.assertEqual(subcalendars[0].assignments, [])
+
+        storage.load_window(subcalendars, 2025, 5)  # june, zero-based
+        self.assertEqual({a.month for a in subcalendars[0].assignments}, {5, 6, 7})
+        storage.load_window(subcalendars, 2025, 7)
+        self.assertEqual({a.month for a in subcalendars[0].assignments}, {6, 7, 8, 9})
+        self.assertFalse(subcalendars[0].dirty)
+
+    def test_write_keeps_unloaded_months(self):
+        from storage.windowed import WindowedStorage
+        storage = WindowedStorage(self.backend)
+        subcalendars = storage.read_all()
+        storage.load_window(subcalendars, 2025, 5)
+        cal = subcalendars[0]
+        cal.remove_assignment(cal.assignments[0])
+        cal.insert_assignment(Assignment("new", "20250620", False))
+        storage.write_dirty(subcalendars)
+
+        stored = self.backend.read_all()[0]
+        self.assertEqual(len(stored.assignments), 24)
+        self.assertNotIn("5-1", [a.name for a in stored.assignments])
+        self.assertIn("new", [a.name for a in stored.assignments])
+        self.assertIn("1-1", [a.name for a in stored.assignments])
+
+class TestBinaryStorageBackend(unittest.TestCase):
+    def test_write_query_rename(self):
+        import tempfile
+        from datetime import date
+        from storage.binary import BinaryStorageBackend
+
+        with tempfile.TemporaryDirectory() as directory:
+            storage = BinaryStorageBackend(directory)
+            cal = Subcalendar("cal", 2)
+            for day in range(1, 31):
+                cal.insert_assignment(Assignment(f"a{day}", f"202506{day:02d}", day % 2, 5))
+            storage.write(cal)
+            storage.query_assignments(date(2025, 6, 1), date(2025, 6, 2))  # keep a map open across the rename
+            storage.rename("cal", "renamed")
+
+            self.assertEqual([(sc.name, sc.color, sc.assignments) for sc in storage.list_subcalendars()], [("renamed", 2, [])])
+            found = storage.query_assignments(date(2025, 6, 10), date(2025, 6, 14), completed=True)
+            self.assertEqual([a.name for a in found["renamed"]], ["a11", "a13"])
+            self.assertEqual(len(storage.read_all()[0].assignments), 30)
+
+    def test_write_leaves_open_readers_alone(self):
+        import tempfile
+        from datetime import date
+        from storage.binary import BinaryStorageBackend
+
+        with tempfile.TemporaryDirectory() as directory:
+            storage = BinaryStorageBackend(directory)
+            cal = Subcalendar("cal", 2)
+            cal.insert_assignment(Assignment("a", "20250601", False, 5))
+            storage.write(cal)
+
+            # a reader on another thread still decoding from the old map
+            reader = storage._open("cal")
+            view = memoryview(reader.map)
+            cal.insert_assignment(Assignment("b", "20250602", False, 5))
+            storage.write(cal)
+            self.assertEqual([a.name for a in reader.assignments_between(date(2025, 6, 1), date(2025, 6, 30))], ["a"])
+            view.release()
+
+            self.assertEqual([a.name for a in storage.query_assignments(date(2025, 6, 1), date(2025, 6, 30))["cal"]], ["a", "b"])
+
+    def test_write_ranges_opens_only_its_snapshot(self):
+        import tempfile
+        from datetime import date
+        from storage.binary import BinaryStorageBackend
+
+        with tempfile.TemporaryDirectory() as directory:
+            storage = BinaryStorageBackend(directory)
+            for name in ("a", "b", "c"):
+                cal = Subcalendar(name)
+                for month in range(1, 13):
+                    cal.insert_assignment(Assignment(f"{name}{month}", f"2025{month:02d}15", False, 5))
+                storage.write(cal)
+
+            # a window holding june and august, where june was emptied and august gained one
+            window = Subcalendar("b")
+            window.insert_assignment(Assignment("b8", "20250815", False, 5))
+            window.insert_assignment(Assignment("new", "20250820", False, 5))
+            storage.write_ranges(window, [(date(2025, 8, 1), date(2025, 8, 31)), (date(2025, 6, 1), date(2025, 6, 30))])
+
+            self.assertEqual(list(storage.snapshots), [])  # only b was opened, and dropped by the write
+            names = [a.name for a in storage.query_assignments(date.min, date.max, ["b"])["b"]]
+            self.assertEqual(names, ["b1", "b2", "b3", "b4", "b5", "b7", "b8", "new", "b9", "b10", "b11", "b12"])
+
+class TestAutosaver(unittest.TestCase):
+    def test_coalesces_edits_and_drains_on_close(self):
+        from storage.autosave import Autosaver
+
+        storage = MemoryStorageBackend()
+        cal = Subcalendar.from_blob("cal", "1")
+        other = Subcalendar.from_blob("other", "1")
+        autosaver = Autosaver(storage, [cal, other], delay=0.05)
+        for day in range(1, 11):
+            with autosaver.lock:
+                cal.insert_assignment(Assignment(f"A{day}", f"202507{day:02d}", False))
+                autosaver.notify()
+        autosaver.close()
+
+        self.assertEqual(storage.written, ["cal"])
+        self.assertFalse(cal.dirty)
+        self.assertEqual(autosaver.status, "saved")
+
+    def test_edit_during_write_stays_dirty(self):
+        import threading
+        from storage.autosave import Autosaver
+
+        class SlowStorage(MemoryStorageBackend):
+            def __init__(self):
+                super().__init__()
+                self.started = threading.Event()
+                self.resume = threading.Event()
+
+            def write(self, subcalendar):
+                self.started.set()
+                self.resume.wait()
+                super().write(subcalendar)
+                self.written.append(len(subcalendar.assignments))
+
+            def rename(self, old_name, new_name):
+                self.written.append(f"{old_name}->{new_name}")
+
+        storage = SlowStorage()
+        cal = Subcalendar.from_blob("cal", "1")
+        autosaver = Autosaver(storage, [cal], delay=0)
+        with autosaver.lock:
+            cal.insert_assignment(Assignment("A", "20250701", False))
+            autosaver.notify()
+        storage.started.wait()
+        with autosaver.lock:  # the copy was taken, so editing doesn't wait on the write
+            cal.insert_assignment(Assignment("B", "20250702", False))
+            cal.rename("renamed")
+            autosaver.rename("cal", "renamed")
+        storage.resume.set()
+        autosaver.close()
+
+        self.assertEqual(storage.written, ["cal", 1, "cal->renamed", "renamed", 2])
+        self.assertFalse(cal.dirty)
+
+    def test_failed_rename_is_kept_and_retried(self):
+        import time
+        from storage.autosave import Autosaver
+
+        class FlakyStorage(MemoryStorageBackend):
+            def __init__(self):
+                super().__init__()
+                self.failures = 1
+
+            def rename(self, old_name, new_name):
+                if self.failures:
+                    self.failures -= 1
+                    raise TimeoutError("copy still pending")
+                self.written.append(f"{old_name}->{new_name}")
+
+        storage = FlakyStorage()
+        autosaver = Autosaver(storage, [Subcalendar("b"), Subcalendar("d")], delay=0.01)  # new, so dirty
+        autosaver.rename("a", "b")
+        autosaver.rename("c", "d")
+
+        # retried without any further edits
+        deadline = time.monotonic() + 5
+        while autosaver.saves == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        autosaver.close()
+
+        self.assertEqual(storage.written[:2], ["a->b", "c->d"])
+        self.assertEqual(sorted(storage.written[2:]), ["b", "d"])
+        self.assertEqual(autosaver.state, "saved")
+        self.assertEqual(autosaver.failures, 0)
+
+    def test_close_retries_failed_final_save(self):
+        from storage import autosave
+        from storage.autosave import Autosaver
+
+        class FlakyStorage(MemoryStorageBackend):
+            def __init__(self):
+                super().__init__()
+                self.failures = 2
+
+            def rename(self, old_name, new_name):
+                if self.failures:
+                    self.failures -= 1
+                    raise TimeoutError("copy still pending")
+                self.written.append(f"{old_name}->{new_name}")
+
+        storage = FlakyStorage()
+        autosaver = Autosaver(storage, [Subcalendar("new")], delay=60)
+        with autosaver.condition:  # queued without scheduling, so only close saves
+            autosaver.renames.append(("old", "new"))
+        delays, autosave.CLOSE_RETRY_DELAYS = autosave.CLOSE_RETRY_DELAYS, (0, 0, 0)
+        try:
+            autosaver.close()
+        finally:
+            autosave.CLOSE_RETRY_DELAYS = delays
+
+        self.assertEqual(storage.written, ["old->new", "new"])
+        self.assertEqual(autosaver.renames, [])
+        self.assertEqual(autosaver.state, "saved")
+
+class TestAsyncStorage(unittest.TestCase):
+    def test_operations_run_in_order_and_callbacks_on_caller(self):
+        import threading
+        from storage import AsyncStorage
+
+        class RecordingStorage(MemoryStorageBackend):
+            def write(self, subcalendar):
+                self.written.append((subcalendar.name, len(subcalendar.assignments)))
+
+            def rename(self, old_name, new_name):
+                self.written.append((old_name, new_name))
+
+        backend = RecordingStorage()
+        io = AsyncStorage(backend)
+        cal = Subcalendar.from_blob("cal", "1\nA,20250714,0,30")
+        threads = []
+        io.write(cal, callback=lambda f: threads.append(threading.current_thread()))
+        cal.insert_assignment(Assignment("B", "20250715", False))  # the write already has its copy
+        cal.rename("renamed")
+        io.rename("cal", "renamed")
+        io.write(cal)
+        io.executor.shutdown(wait=True)  # done callbacks have been queued once the storage thread exits
+
+        self.assertEqual(backend.written, [("cal", 1), ("cal", "renamed"), ("renamed", 2)])
+        self.assertEqual(threads, [])
+        self.assertEqual(io.run_callbacks(), 3)
+        self.assertEqual(threads, [threading.current_thread()])
+        self.assertEqual(io.pending, 0)
+        io.close()
+
+class TestLocalStorageBackend(unittest.TestCase):
+    def test_batched_write_is_atomic_and_readable(self):
+        import os
+        import tempfile
+        from storage.local import LocalStorageBackend
+
+        with tempfile.TemporaryDirectory() as directory:
+            storage = LocalStorageBackend(directory)
+            cals = [Subcalendar.from_blob(f"cal{i}", f"{i + 1}\nA{i},20250714,{i % 2},{i}") for i in range(3)]
+            cals[1].toggle_completion(cals[1].assignments[0])
+            with open(os.path.join(directory, ".cal9.tmp"), "w") as file:  # left by an interrupted write
+                file.write("garbage")
+
+            self.assertEqual(storage.write_dirty(cals), 1)
+            storage.write_many(cals)
+            with open(os.path.join(directory, "cal2"), encoding="utf-8") as file:
+                self.assertEqual(file.read(), "3\nA2,20250714,0,2\n")
+
+            self.assertEqual(sorted(os.listdir(directory)), [".cal9.tmp", "cal0", "cal1", "cal2"])
+            read = sorted(storage.read_all(), key=lambda sc: sc.name)
+            self.assertEqual([sc.to_dict() for sc in read], [sc.to_dict() for sc in cals])
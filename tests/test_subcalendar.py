@@ -1,6 +1,7 @@
 # test_subcalendar.py
 
 import unittest
+from datetime import date
 from subcalendar import Assignment, Subcalendar
 
 class TestAssignment(unittest.TestCase):
@@ -11,6 +12,15 @@ class TestAssignment(unittest.TestCase):
         self.assertEqual(a.studytime, 30)
         self.assertFalse(a.completed)
 
+    def test_date_fields(self):
+        a = Assignment("Test", "20240229", False)
+        self.assertEqual((a.year, a.month, a.day), (2024, 2, 29))
+        self.assertEqual(a.date, date(2024, 2, 29))
+        self.assertEqual(a.date_str, "20240229")
+        self.assertFalse(hasattr(a, "__dict__"))
+        with self.assertRaises(ValueError):
+            Assignment("Bad", "20250230", False)
+
     def test_toggle_completion(self):
         a = Assignment("Toggle", "20250714", False)
         a.toggle_completion()
@@ -36,3 +46,54 @@ class TestSubcalendar(unittest.TestCase):
         self.assertFalse(cal.hidden)
         cal.toggle_hidden()
         self.assertTrue(cal.hidden)
+
+    def test_range_lookup(self):
+        cal = Subcalendar("Test")
+        for d in ["20250801", "20250715", "20250714", "20250731", "20250714"]:
+            cal.insert_assignment(Assignment(d, d, False))
+        names = [a.name for a in cal.assignments_between(date(2025, 7, 14), date(2025, 7, 31))]
+        self.assertEqual(names, ["20250714", "20250714", "20250715", "20250731"])
+        self.assertEqual(len(cal.assignments_on(date(2025, 7, 14))), 2)
+        self.assertEqual(cal.assignments_on(date(2025, 7, 16)), [])
+
+    def test_remove_assignment(self):
+        cal = Subcalendar("Test")
+        a1 = Assignment("A", "20250714", False)
+        a2 = Assignment("B", "20250714", False)
+        cal.insert_assignment(a1)
+        cal.insert_assignment(a2)
+        self.assertTrue(cal.remove_assignment(a2))
+        self.assertFalse(cal.remove_assignment(a2))
+        self.assertEqual(cal.assignments_on(date(2025, 7, 14)), [a1])
+
+    # assigning the list directly (e.g. from_dict) keeps the index sorted
+    def test_assignments_setter_sorts(self):
+        cal = Subcalendar.from_dict({"name": "Test", "assignments": [
+            {"name": "B", "year": 2025, "month": 7, "day": 15},
+            {"name": "A", "year": 2025, "month": 7, "day": 14},
+        ]})
+        self.assertEqual([a.name for a in cal.assignments], ["A", "B"])
+        self.assertEqual(cal.assignments_on(date(2025, 7, 15))[0].name, "B")
+
+    def test_weekly_studytime(self):
+        cal = Subcalendar("Test")
+        a1 = Assignment("A", "20250714", False, 30)  # monday
+        a2 = Assignment("B", "20250720", False, 45)  # sunday, same week
+        a3 = Assignment("C", "20250721", False, 60)  # next monday
+        for a in (a1, a2, a3):
+            cal.insert_assignment(a)
+        self.assertEqual(cal.studytime_for_week(date(2025, 7, 14)), 75)
+        self.assertEqual(cal.studytime_for_week(date(2025, 7, 21)), 60)
+
+        cal.set_studytime(a1, 10)
+        self.assertEqual(cal.studytime_for_week(date(2025, 7, 14)), 55)
+        cal.remove_assignment(a2)
+        self.assertEqual(cal.studytime_for_week(date(2025, 7, 14)), 10)
+
+    def test_parse_reports_bad_lines(self):
+        text = "3\nA,20250715,0,30\nB,notadate,0\nshort\n\nC,20250714,1\nD,20250716,x\n"
+        cal, errors = Subcalendar.parse("Test", text)
+        self.assertEqual(cal.color, 3)
+        self.assertEqual([a.name for a in cal.assignments], ["C", "A"])
+        self.assertEqual([line for line, _ in errors], [3, 4, 7])
+        self.assertFalse(cal.dirty)
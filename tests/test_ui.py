@@ -0,0 +1,79 @@
+# test_ui.py
+
+import curses
+import unittest
+from datetime import date
+from benchmarks import headless_curses
+from storage.backend_base import StorageBackend
+from subcalendar import Assignment, Subcalendar
+from utils import zeller
+
+try:
+    from ui import UI
+except SyntaxError:  # ui.py needs python 3.12
+    UI = None
+
+PATCHED = ("start_color", "use_default_colors", "init_pair", "curs_set", "echo", "noecho", "color_pair", "newwin", "ACS_HLINE", "ACS_VLINE")
+
+class NullStorage(StorageBackend):
+    name = "test"
+
+    def read_all(self):
+        return []
+
+    def write(self, subcalendar):
+        pass
+
+    def rename(self, old_name, new_name):
+        pass
+
+@unittest.skipIf(UI is None, "ui.py does not compile on this python")
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.original = {name: getattr(curses, name) for name in PATCHED if hasattr(curses, name)}
+        self.stdscr = headless_curses.install()
+        self.ui = UI(self.stdscr, NullStorage())
+        self.ui.working_year, self.ui.working_month, self.ui.selected_day = 2025, 5, 15
+        self.ui.first_day_offset = zeller(5, 2025)
+        self.subcalendars = [Subcalendar.from_blob("cop4504", "1\nWeek 2,20250615,0,30\nWeek 3,20250621,0,45")]
+        self.ui.draw_calendar_base()
+        self.ui.draw_assignments(self.subcalendars)
+
+    def tearDown(self):
+        self.ui.io.close()
+        for name, value in self.original.items():
+            setattr(curses, name, value)
+
+    def test_popup_close_repaints_mainwin_without_touching_stdscr(self):
+        self.stdscr.record = self.ui.mainwin.record = True
+        self.stdscr.keys = [10]  # enter opens the popup, which closes on the ESC that follows
+        running, update_view = self.ui.prompt(self.subcalendars)
+
+        self.assertTrue(running)
+        self.assertFalse(update_view)
+        self.assertNotIn("touchwin", [name for name, _ in self.stdscr.history])
+        self.assertEqual([name for name, _ in self.ui.mainwin.history[-2:]], ["touchwin", "refresh"])
+
+    def test_edit_redraws_only_its_cell(self):
+        self.subcalendars[0].insert_assignment(Assignment("Quiz", "20250610", False, 20))
+        self.ui.invalidate_day(date(2025, 6, 10))
+        self.assertEqual(self.ui.dirty_days, {10})
+
+        self.ui.mainwin.record = True
+        self.ui.draw_dirty_cells(self.subcalendars)
+
+        cells = self.ui.month_cache[(2025, 5)]
+        self.assertEqual([a.name for _, a in cells[10]], ["Quiz"])
+        self.assertEqual(self.ui.dirty_days, set())
+        # every write lands inside the cell of the 10th
+        day_pos = 10 - 1 + self.ui.first_day_offset
+        top = (day_pos // 7) * self.ui.mainwin_hfactor + 1
+        left = (day_pos % 7) * self.ui.mainwin_wfactor + 1
+        writes = [args for name, args in self.ui.mainwin.history if name == "addstr"]
+        self.assertTrue(writes)
+        for y, x, *_ in writes:
+            self.assertTrue(top < y < top + self.ui.mainwin_hfactor, (y, x))
+            self.assertTrue(left <= x < left + self.ui.mainwin_wfactor, (y, x))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,10 @@
 # test_utils.py
 
+import os
+import tempfile
+import threading
 import unittest
-from utils import contains_bad_chars, zeller, get_days_in_month
+from utils import contains_bad_chars, zeller, get_days_in_month, write_atomic, write_temp
 
 class TestUtils(unittest.TestCase):
     def test_contains_bad_chars(self):
@@ -29,4 +32,25 @@ class TestUtils(unittest.TestCase):
 
         self.assertEqual(get_days_in_month(1, 2025), 28)  # check february has 28 days on a non leap year
 
-        self.assertEqual(get_days_in_month(1, 2024), 29)  # 29 days on a leap year
\ No newline at end of file
+        self.assertEqual(get_days_in_month(1, 2024), 29)  # 29 days on a leap year
+
+    def test_concurrent_atomic_writes_never_mix(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cal")
+            self.assertNotEqual(write_temp(path, b"a"), write_temp(path, b"b"))
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+
+            payloads = [bytes([65 + n]) * 200000 for n in range(4)]
+            def work(data):
+                for _ in range(10):
+                    write_atomic(path, data)
+            threads = [threading.Thread(target=work, args=(data,)) for data in payloads]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            with open(path, "rb") as file:
+                self.assertIn(file.read(), payloads)
+            self.assertEqual(os.listdir(directory), ["cal"])
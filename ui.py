@@ -15,6 +15,7 @@ optimization/refactoring:
 """
 
 import curses
+import time
 
 from utils import (
     contains_bad_chars,
@@ -23,12 +24,19 @@ from utils import (
     get_days_in_month, zeller
 )
 from subcalendar import Assignment, Subcalendar
+from storage import AsyncStorage
+from profiling import timed, timings
+import columnar
 from datetime import date, datetime, timedelta
 
+POLL_MS = 100
+
 class UI:
     def __init__(self, stdscr, storage):
         self.stdscr = stdscr
         self.storage = storage
+        self.io = AsyncStorage(storage) # writes and renames run off the ui thread
+        self.autosaver = None # set by main when autosave is on
 
         # TODO: recalculate window sizes on terminal resize
         self.screen_h, self.screen_w = self.stdscr.getmaxyx()
@@ -59,6 +67,14 @@ class UI:
 
         self.update_counter = 0
 
+        # render cache of cell contents, keyed by (year, zero-based month)
+        self.month_cache = {} # (year, month) -> {day: [(subcalendar, assignment), ...]}
+        self.stale_days = {} # (year, month) -> days whose cached cell contents must be rebuilt
+        self.dirty_days = set() # days of the working month whose cells need redrawing
+
+        # vectorized aggregates for the status line, only when numpy is installed
+        self.columnar = columnar.ColumnarSnapshot() if columnar.available() else None
+
         self.init_color_pairs()
         self.init_windows()
 
@@ -81,6 +97,7 @@ Subcalendars
 z          Toggle visibility of currently selected subcalendar
 :nc        Create new subcalendar
 :w         Write and save all subcalendars
+:stats     Show timings of drawing and storage calls
 
 Assignments
 -----------
@@ -153,6 +170,7 @@ Quit
         self.mainwin = curses.newwin(self.mainwin_h, self.mainwin_w, self.mainwin_y, self.mainwin_x)
         self.promptwin = curses.newwin(self.promptwin_h, self.promptwin_w, self.promptwin_y, self.promptwin_x)
 
+    @timed("draw_calendar_base")
     def draw_calendar_base(self):
         self.mainwin.erase()
         # 5 horizontal lines (6 columns of days)
@@ -214,6 +232,7 @@ Quit
         self.last_cursor_pos = (y, x, self.selected_day)
 
     # draw selection cursor and highlight current date TODO: maybe make this two separate functions?
+    @timed("draw_cursor")
     def draw_cursor(self):
         today = date.today()
         today_is_visible = (
@@ -255,56 +274,108 @@ Quit
 
         self.last_cursor_pos = (y, x, self.selected_day)
 
+    # cell contents for a month, built once from the date index and then patched per day on invalidation.
+    # hidden subcalendars are kept in the cache and filtered when drawing so visibility toggles don't invalidate it
+    def get_month_cells(self, subcalendars: list[Subcalendar], year: int, month: int) -> dict:
+        key = (year, month)
+        cells = self.month_cache.get(key)
+        if cells is None:
+            month_start = date(year, month + 1, 1)
+            month_end = date(year, month + 1, get_days_in_month(month, year))
+            cells = {}
+            for cal in subcalendars:
+                for a in cal.assignments_between(month_start, month_end):
+                    cells.setdefault(a.day, []).append((cal, a))
+            self.month_cache[key] = cells
+            self.stale_days.pop(key, None)
+        else:
+            for day in self.stale_days.pop(key, ()):
+                selected = date(year, month + 1, day)
+                entries = [(cal, a) for cal in subcalendars for a in cal.assignments_on(selected)]
+                if entries:
+                    cells[day] = entries
+                else:
+                    cells.pop(day, None)
+        return cells
+
+    # mark a single day as changed so only its cell is rebuilt and redrawn
+    def invalidate_day(self, d: date):
+        key = (d.year, d.month - 1)
+        if key in self.month_cache:
+            self.stale_days.setdefault(key, set()).add(d.day)
+        if key == (self.working_year, self.working_month):
+            self.dirty_days.add(d.day)
+
+    def invalidate_month_cache(self):
+        self.month_cache.clear()
+        self.stale_days.clear()
+
+    # redraw every cell of the working month without touching the grid
+    def mark_all_days_dirty(self):
+        self.dirty_days.update(range(1, get_days_in_month(self.working_month, self.working_year) + 1))
+
     """
     TODO:
-    - optimize it by instead of iterating through every assignment start from the working month and year
-    - need to add insert functionality to subcalendar class
     - show assignments from day cells outside of the selected month
-    - month caching?
     """
+    @timed("draw_assignments")
     def draw_assignments(self, subcalendars: list[Subcalendar]):
-        max_per_day = self.mainwin_hfactor - 2  # dynamic limit per cell height
-        day_map = {}
+        cells = self.get_month_cells(subcalendars, self.working_year, self.working_month)
+        for day, assignments in cells.items():
+            self.draw_cell(day, assignments)
+        self.dirty_days.clear()
+        self.mainwin.refresh()
 
-        # group assignments by (year, month, day)
-        for cal in subcalendars:
-            if cal.hidden:
-                continue
-            for a in cal.assignments:
-                if a.year == self.working_year and a.month - 1 == self.working_month:
-                    key = a.day
-                    day_map.setdefault(key, []).append((cal, a))
-                elif a.year > self.working_year or \
-                    (a.year == self.working_year and a.month - 1 > self.working_month):
-                    break  # Assignments are sorted
-
-        for day, assignments in day_map.items():
-            day_pos = day - 1 + self.first_day_offset
-            base_y = (day_pos // 7) * self.mainwin_hfactor + 2
-            x = (day_pos % 7) * self.mainwin_wfactor + 1
+    # redraw only the cells invalidated since the last frame
+    @timed("draw_dirty_cells")
+    def draw_dirty_cells(self, subcalendars: list[Subcalendar]):
+        cells = self.get_month_cells(subcalendars, self.working_year, self.working_month)
+        for day in self.dirty_days:
+            self.clear_cell(day)
+            self.draw_cell(day, cells.get(day, []))
+        self.dirty_days.clear()
+        self.mainwin.refresh()
 
-            limit = max_per_day
-            if len(assignments) > max_per_day:
-                limit -= 1  # reserve space for "+N more"
+    # blank the assignment rows of a cell, leaving the day number and grid lines alone
+    def clear_cell(self, day: int):
+        day_pos = day - 1 + self.first_day_offset
+        base_y = (day_pos // 7) * self.mainwin_hfactor + 2
+        x = (day_pos % 7) * self.mainwin_wfactor + 1
+        blank = " " * (self.mainwin_wfactor - 1)
+        for i in range(self.mainwin_hfactor - 2):
+            try:
+                self.mainwin.addstr(base_y + i, x, blank)
+            except:
+                pass
+
+    def draw_cell(self, day: int, entries: list):
+        max_per_day = self.mainwin_hfactor - 2  # dynamic limit per cell height
+        assignments = [(cal, a) for cal, a in entries if not cal.hidden]
 
-            for i, (cal, a) in enumerate(assignments[:limit]):
-                y = base_y + i
-                try:
-                    self.mainwin.attron(curses.color_pair(cal.color))
-                    if a.completed:
-                        self.mainwin.addstr(y, x, "✓ " + a.name[:self.mainwin_wfactor - 3])
-                    else:
-                        self.mainwin.addstr(y, x, a.name[:self.mainwin_wfactor - 1])
-                    self.mainwin.attroff(curses.color_pair(cal.color))
-                except:
-                    pass  # prevent drawing errors
+        day_pos = day - 1 + self.first_day_offset
+        base_y = (day_pos // 7) * self.mainwin_hfactor + 2
+        x = (day_pos % 7) * self.mainwin_wfactor + 1
 
-            if len(assignments) > limit:
-                y = base_y + limit
-                more = len(assignments) - limit
-                self.mainwin.addstr(y, x, f"+{more} more")
+        limit = max_per_day
+        if len(assignments) > max_per_day:
+            limit -= 1  # reserve space for "+N more"
 
-        self.mainwin.refresh()
+        for i, (cal, a) in enumerate(assignments[:limit]):
+            y = base_y + i
+            try:
+                self.mainwin.attron(curses.color_pair(cal.color))
+                if a.completed:
+                    self.mainwin.addstr(y, x, "✓ " + a.name[:self.mainwin_wfactor - 3])
+                else:
+                    self.mainwin.addstr(y, x, a.name[:self.mainwin_wfactor - 1])
+                self.mainwin.attroff(curses.color_pair(cal.color))
+            except:
+                pass  # prevent drawing errors
+
+        if len(assignments) > limit:
+            y = base_y + limit
+            more = len(assignments) - limit
+            self.mainwin.addstr(y, x, f"+{more} more")
 
     """
     TODO:
@@ -315,6 +386,18 @@ Quit
     - y and d add assignments to clipboard_buffer
     - should also be able to cycle subcalendars from this view
     """
+    # (subcalendar, assignment) pairs due on the selected date, skipping hidden subcalendars
+    def get_selected_day_assignments(self, subcalendars: list[Subcalendar]) -> list:
+        selected = date(self.working_year, self.working_month + 1, self.selected_day)
+        assignments = []
+        for cal in subcalendars:
+            if cal.hidden:
+                continue
+            for a in cal.assignments_on(selected):
+                assignments.append((cal, a))
+        return assignments
+
+    @timed("show_day_popup")
     def show_day_popup(self, subcalendars: list[Subcalendar]):
         popup_h = min(10, self.mainwin_hfactor + 1)
         popup_w = self.mainwin_w
@@ -333,13 +416,7 @@ Quit
         self.promptwin.refresh()
 
         # gather assignments for the selected day
-        assignments = []
-        for cal in subcalendars:
-            if cal.hidden:
-                continue
-            for a in cal.assignments:
-                if a.day == self.selected_day and a.month == self.working_month + 1 and a.year == self.working_year:
-                    assignments.append((cal, a))
+        assignments = self.get_selected_day_assignments(subcalendars)
         """
         TODO: this avoids the divide by zero issues on scroll,
         but intuitively i still want to see the day popup on an empty day and add assignments from there.
@@ -357,6 +434,7 @@ Quit
         day_name = get_day_date_name(day_date)
 
         while True:
+            frame_start = time.perf_counter()
             popup.erase()
             popup.border()
             popup.addstr(0, 2, f" {day_name}-{self.working_month + 1}-{self.selected_day}-{self.working_year} ")
@@ -394,6 +472,7 @@ Quit
                     pass
 
             popup.refresh()
+            timings.record("show_day_popup.frame", time.perf_counter() - frame_start) # the whole call includes time spent reading keys
             key = popup.getch()
 
             if key in (ord('j'), curses.KEY_DOWN):
@@ -408,19 +487,15 @@ Quit
                         top -= 1
 
             elif key == ord(' '):  # toggle completion
-                assignments[selected][1].toggle_completion()
+                cal, a = assignments[selected]
+                cal.toggle_completion(a)
+                self.invalidate_day(day_date.date())
                 self.saved = False
 
             elif key == ord('A'):
                 added = self.new_assignment(subcalendars, self.selected_day, self.working_month + 1, self.working_year)
                 if added:
-                    assignments = []
-                    for cal in subcalendars:
-                        if cal.hidden:
-                            continue
-                        for a in cal.assignments:
-                            if a.day == self.selected_day and a.month == self.working_month + 1 and a.year == self.working_year:
-                                assignments.append((cal, a))
+                    assignments = self.get_selected_day_assignments(subcalendars)
                     selected = 0
                     top = 0
 
@@ -460,16 +535,11 @@ Quit
 
                 if count > 0:
                     self.msg = f"Pasted {count} assignments to {subcalendar.name}"
+                    self.invalidate_day(day_date.date())
                     self.saved = False
 
                 # refresh assignment list after paste
-                assignments = []
-                for cal in subcalendars:
-                    if cal.hidden:
-                        continue
-                    for a in cal.assignments:
-                        if a.day == self.selected_day and a.month == self.working_month + 1 and a.year == self.working_year:
-                            assignments.append((cal, a))
+                assignments = self.get_selected_day_assignments(subcalendars)
                 # selected = 0
                 # top = 0
 
@@ -485,7 +555,8 @@ Quit
                             if a not in clipboard_buffer:
                                 clipboard_buffer.append(a)
                         for cal in subcalendars:
-                            cal.assignments = [a for a in cal.assignments if a not in to_delete]
+                            cal.remove_assignments(to_delete)
+                        self.invalidate_day(day_date.date())
                         self.saved = False
 
                 # update main clipboard
@@ -496,8 +567,24 @@ Quit
                 self.clipboard = clipboard_buffer.copy()
                 break
 
+        # the caller repaints mainwin over the popup. stdscr is left untouched, or the next getch would
+        # refresh it and blank the calendar
         del popup
-        self.stdscr.touchwin()
+
+    def show_stats(self):
+        curses.curs_set(0)
+        self.mainwin.erase()
+        lines = (" STATS - rolling latencies of the last calls\n------\n\n" + timings.report()).splitlines()
+        for y, line in enumerate(lines[:self.mainwin_h]):
+            try:
+                self.mainwin.addstr(y, 0, line[:self.mainwin_w - 1])
+            except curses.error:
+                pass
+        self.promptwin.erase()
+        self.promptwin.addstr(0, 0, "Stats - press any key to continue")
+        self.promptwin.refresh()
+        self.mainwin.refresh()
+        self.stdscr.getch()
 
     def new_assignment(self, subcalendars, day, month, year) -> bool:
         subcalendar = subcalendars[self.selected_subcal]
@@ -543,9 +630,43 @@ Quit
             return False
         else:
             self.msg = f"Created new assignment '{name}' in {subcalendar.name}"
+            self.invalidate_day(date(year, month, day))
             self.saved = False
             return True
 
+    # write only the subcalendars that changed since they were last written
+    def write_changes(self, subcalendars) -> int:
+        if self.autosaver:
+            self.autosaver.save_now()
+            self.msg = "Saving in the background"
+            self.saved = True
+            return 0
+
+        dirty = [sc for sc in subcalendars if sc.dirty]
+        states = [(sc.version, sc.name, sc.hidden, sc.color) for sc in dirty]
+
+        def written(future):
+            if future.exception() is not None:
+                self.msg = f"Error: failed to save changes: {future.exception()}"
+                self.saved = False
+                return
+            for sc, state in zip(dirty, states):
+                if (sc.version, sc.name, sc.hidden, sc.color) == state:
+                    sc.mark_clean() # unless it was edited again while being written
+            self.msg = f"Changes saved ({len(dirty)} of {len(subcalendars)} subcalendars written)"
+
+        if dirty:
+            self.io.write_many(dirty, callback=written)
+            self.msg = f"Saving {len(dirty)} of {len(subcalendars)} subcalendars"
+        else:
+            self.msg = "No changes to save"
+        self.saved = True
+        return len(dirty)
+
+    def renamed(self, future, old_name: str, new_name: str):
+        if future.exception() is not None:
+            self.msg = f"Error: failed to rename '{old_name}' to '{new_name}' in storage: {future.exception()}"
+
     def change_date(self, delta: int) -> bool: # TODO: rename to move_date, to compliment a new set_date fuction
         self.delta = delta
         current = date(self.working_year, self.working_month + 1, self.selected_day)
@@ -569,20 +690,47 @@ Quit
         selected = date(self.working_year, self.working_month + 1, self.selected_day)
         return selected - timedelta(days=selected.weekday())  # monday?
 
+    # per-subcalendar weekly totals are maintained on insert/remove, so this doesn't touch any assignments
+    @timed("sum_studytime_for_week")
     def sum_studytime_for_week(self, subcalendars, selected_week_start):
-        week_end = selected_week_start + timedelta(days=6)
         total_minutes = 0
 
         for subcal in subcalendars:
             if subcal.hidden:
                 continue
-            for a in subcal.assignments:
-                if selected_week_start <= a.date <= week_end:
-                    total_minutes += a.studytime
+            total_minutes += subcal.studytime_for_week(selected_week_start)
 
         return total_minutes
 
 
+    # completed/total assignments in the working month, e.g. "  done: 3/8"
+    def get_month_completion(self, subcalendars) -> str:
+        if self.columnar is None:
+            return ""
+        self.columnar.refresh(subcalendars)
+        month_start = date(self.working_year, self.working_month + 1, 1)
+        month_end = date(self.working_year, self.working_month + 1, get_days_in_month(self.working_month, self.working_year))
+        totals = self.columnar.totals(month_start, month_end)
+        return f"  done: {totals['completed']}/{totals['count']}"
+
+    # the autosave thread may only copy subcalendars while we're idle here
+    # while storage operations are in flight getch times out every POLL_MS, so their callbacks run and the
+    # status line updates without a key press. returns curses.ERR on those wakeups
+    def wait_for_key(self) -> int:
+        busy = self.io.pending or (self.autosaver and self.autosaver.state in ("pending", "saving"))
+        self.stdscr.timeout(POLL_MS if busy else -1)
+        if self.autosaver is None:
+            key = self.stdscr.getch()
+        else:
+            self.autosaver.lock.release()
+            try:
+                key = self.stdscr.getch()
+            finally:
+                self.autosaver.lock.acquire()
+        self.stdscr.timeout(-1)
+        self.io.run_callbacks()
+        return key
+
     # prompt - handles input and returns two booleans to redraw the main window and continue the main loop
     def prompt(self, subcalendars: list[Subcalendar]) -> tuple[bool, bool]:
         curses.curs_set(0)
@@ -590,8 +738,11 @@ Quit
 
         selected_week_start = self.get_selected_week_start()
         study_minutes = self.sum_studytime_for_week(subcalendars, selected_week_start)
+        month_done = self.get_month_completion(subcalendars)
 
-        status = f"{'[+]' if not self.saved else ''}{f"  {self.operator} " if self.operator else ' '} {self.storage.name}  study time: {study_minutes}  {self.update_counter}  {self.count_buffer if self.count_buffer else self.delta}  {'[H]' if subcalendar.hidden else ''}{subcalendar.name}"
+        autosave = f"[{self.autosaver.status}] " if self.autosaver else ''
+        pending = f"[{self.io.pending} pending] " if self.io.pending else ''
+        status = f"{pending}{autosave}{'[+]' if not self.saved and not self.autosaver else ''}{f"  {self.operator} " if self.operator else ' '} {self.storage.name}  study time: {study_minutes}{month_done}  {self.update_counter}  {self.count_buffer if self.count_buffer else self.delta}  {'[H]' if subcalendar.hidden else ''}{subcalendar.name}"
 
         self.promptwin.erase()
         try:
@@ -607,7 +758,9 @@ Quit
         update_view = False
         running = True
 
-        key = self.stdscr.getch()
+        key = self.wait_for_key()
+        if key == curses.ERR: # woke up for finished storage operations, just redraw the status line
+            return running, update_view
 
         # enter command mode
         if key == ord(':'):
@@ -624,7 +777,7 @@ Quit
                     break
                 elif k in (10, 13):  # enter
                     if command == ":q": # quit
-                        if not self.saved:
+                        if not self.saved and not self.autosaver: # autosave drains on exit
                             self.msg = "Error: no write since last change. Use :q! to force quit"
                         else:
                             running = False
@@ -642,17 +795,14 @@ Quit
                         self.mainwin.refresh()
                         self.stdscr.getch()
 
+                    elif command == ":stats": # timings of the hot paths
+                        self.show_stats()
+
                     elif command == ":w": # write
-                        for cal in subcalendars:
-                            self.storage.write(cal)
-                        self.msg = "Changes saved"
-                        self.saved = True
+                        self.write_changes(subcalendars)
 
                     elif command == ":wq": # write quit
-                        for cal in subcalendars:
-                            self.storage.write(cal)
-                        self.msg = "Changes saved"
-                        self.saved = True
+                        self.write_changes(subcalendars)
                         running = False
 
                     elif command == ":nc":  # new subcalendar
@@ -767,7 +917,10 @@ Quit
                         subcalendar.rename(name)
 
                         if old_name != name:
-                            self.storage.rename(old_name, name)
+                            if self.autosaver:
+                                self.autosaver.rename(old_name, name)
+                            else:
+                                self.io.rename(old_name, name, callback=lambda f: self.renamed(f, old_name, name))
 
                         self.msg = f"Renamed Subcalendar '{name}'"
                         self.saved = False
@@ -777,19 +930,18 @@ Quit
         elif key == ord('z'):
             subcalendar.toggle_hidden()
             self.msg = f"{subcalendar.name} {'hidden' if subcalendar.hidden else 'unhidden'}"
-            update_view = True
+            self.mark_all_days_dirty()
 
         elif key in (10, 13): # enter
             self.show_day_popup(subcalendars)
-            self.stdscr.touchwin()
-            self.stdscr.refresh()
-            update_view = True
+            # the main window buffer is untouched by the popup, so repaint it as-is and let the
+            # main loop redraw only the cells that were edited
+            self.mainwin.touchwin()
+            self.mainwin.refresh()
 
         # new assignment
         elif key == ord('A'):
-            added = self.new_assignment(subcalendars, self.selected_day, self.working_month + 1, self.working_year)
-            if added:
-                update_view = True
+            self.new_assignment(subcalendars, self.selected_day, self.working_month + 1, self.working_year)
 
         # navigation
         elif key in (ord('l'), curses.KEY_RIGHT):
@@ -2,8 +2,16 @@
 # TODO: lots of normalization going on here currently. maybe refactor to make it less confusing?
 
 import calendar
+import os
+import tempfile
+from contextlib import contextmanager
 from datetime import date, datetime
 
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
 def contains_bad_chars(name: str) -> bool:
     invalid_chars = {'\t', '\n', '\r', '\x1b', ',', '<', '>', ':', '"', '/', '\\', '|'}
     if any(ch in invalid_chars for ch in name):
@@ -67,4 +75,52 @@ def zeller(month, year):
     offset = ((13 * z_month - 1) // 5 + day + z_year % 100 +
               (z_year % 100) // 4 - 2 * (z_year // 100) +
               (z_year // 400) + 77) % 7
-    return offset
\ No newline at end of file
+    return offset
+
+# ---- FILE I/O ----
+
+# make renames and new files in a directory durable
+def fsync_dir(directory: str):
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+# hold an exclusive lock on path (created if missing) between processes and threads alike, since each
+# call opens its own file. without fcntl it only runs the block
+@contextmanager
+def file_lock(path: str):
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # releases the lock
+
+# write data to a synced temporary file next to path in one write call and return its path. the name is
+# a hidden dotfile, so directory listings can skip it, and unique, so two writers of the same path never
+# share one
+def write_temp(path: str, data: bytes) -> str:
+    directory, filename = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f".{filename}.", suffix=".tmp")
+    try:
+        if hasattr(os, "fchmod"):
+            os.fchmod(fd, 0o644)  # mkstemp makes it private
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+    except BaseException:
+        os.close(fd)
+        os.remove(tmp_path)
+        raise
+    os.close(fd)
+    return tmp_path
+
+# replace path with data so a crash leaves either the old file or the new one, never a truncated one
+def write_atomic(path: str, data: bytes):
+    os.replace(write_temp(path, data), path)
+    fsync_dir(os.path.dirname(path) or ".")
@@ -0,0 +1,17 @@
+# wsgi.py - production entry point for the web app
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#   python serve.py --workers 4          (no extra dependencies, unix only)
+#
+# every worker process imports this module itself, then opens its own storage client and reuses it
+# for all of its requests. the workers share the loaded subcalendars through a sqlite file
+# (CALICULA_SHARED_CACHE, by default ~/.cache/calicula/api-cache.db) so only one of them has to read
+# storage after a write or once the ttl runs out, and warm_up loads it before the first request
+
+import os
+
+os.environ.setdefault("CALICULA_SHARED_CACHE", os.path.expanduser("~/.cache/calicula/api-cache.db"))
+
+from app import app, warm_up  # noqa: E402 - the shared cache path has to be set before app is imported
+
+application = app